@@ -0,0 +1,277 @@
+import sys
+import threading
+import time
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+# Bulk product fetch: SKU ids -> product records, each with an 'id'; unknown SKUs are left out
+FetchProducts = Callable[[List[str]], Iterable[Dict[str, Any]]]
+
+class CatalogVersion:
+    """
+    Immutable columnar table of one catalog version, indexed by SKU id
+
+    Every row keeps the full product record as returned by the SKU service, plus typed
+    price, available and stock columns for the quote validation rules.
+    """
+    def __init__(self, version: int, ids: np.ndarray, records: np.ndarray, price: np.ndarray,
+                 available: np.ndarray, stock: np.ndarray, nbytes: Optional[int] = None):
+        self.version = version
+        self.ids = ids
+        self.records = records
+        self.price = price
+        self.available = available
+        self.stock = stock
+        self.index = {sku_id: i for i, sku_id in enumerate(ids.tolist())}
+        self.created_at = time.time()
+        for column in (ids, records, price, available, stock):
+            column.setflags(write=False)
+        self.nbytes = nbytes if nbytes is not None else _rows_nbytes(ids, records, price, available, stock)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, sku_id: str) -> bool:
+        return str(sku_id) in self.index
+
+    def positions(self, sku_ids: Sequence[str]) -> np.ndarray:
+        """
+        Returns the row of every SKU id, -1 for unknown ids
+        """
+        return np.array([self.index.get(str(sku_id), -1) for sku_id in sku_ids], dtype=np.int64)
+
+    def get(self, sku_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a copy of one product record, or None when the SKU is unknown
+        """
+        row = self.index.get(str(sku_id))
+        return dict(self.records[row]) if row is not None else None
+
+    def entries(self, sku_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns price, availability and stock of the known SKUs among sku_ids, keyed by SKU id
+        """
+        entries = {}
+        for sku_id, row in zip(sku_ids, self.positions(sku_ids).tolist()):
+            if row >= 0:
+                stock = self.stock[row]
+                entries[str(sku_id)] = {
+                    'price': float(self.price[row]),
+                    'available': bool(self.available[row]),
+                    'stock': None if np.isnan(stock) else float(stock)
+                }
+        return entries
+
+    def row(self, sku_id: str) -> Optional[tuple]:
+        """
+        Returns the stored (record, available) pair of one SKU, or None when the SKU is unknown
+        """
+        row = self.index.get(str(sku_id))
+        return (self.records[row], bool(self.available[row])) if row is not None else None
+
+    def is_available(self, sku_id: str) -> bool:
+        row = self.index.get(str(sku_id))
+        return row is not None and bool(self.available[row])
+
+class CatalogSnapshot:
+    """
+    Read-optimized, versioned in-process copy of the SKU catalog
+
+    The snapshot reads through to the SKU service: SKUs it does not hold yet are
+    fetched with one fetch_products call and added to a new version, so a SKU costs
+    a round trip only the first time it is quoted. Every refresh_interval seconds a
+    background thread fetches the SKUs it holds again, in batches, and publishes a new
+    version when anything changed; SKUs the service no longer returns are dropped.
+    Records without an 'available' field are checked with is_available, and count as
+    unavailable without it.
+
+    Readers take `current` and use that version for the whole request; it never
+    changes underneath them. New versions are built from copies of the columns and
+    published with a single reference swap, so reads never take a lock. A version
+    larger than max_bytes is not published: the fetched records are still returned
+    and the previous version keeps serving. The refresh thread starts on first use,
+    so constructing a snapshot starts no threads.
+    """
+    def __init__(self, fetch_products: FetchProducts, is_available: Optional[Callable[[str], bool]] = None,
+                 refresh_interval: float = 30.0, max_bytes: Optional[int] = 256 * 1024 ** 2,
+                 batch_size: int = 1000):
+        self.fetch_products = fetch_products
+        self.is_available = is_available
+        self.refresh_interval = refresh_interval
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.last_error: Optional[BaseException] = None
+        self._current: Optional[CatalogVersion] = None
+        self._publish_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> Optional[CatalogVersion]:
+        """
+        Returns the latest published version, or None before any SKU has been fetched
+        """
+        return self._current
+
+    def products(self, sku_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Returns the product records of sku_ids in order, skipping unknown SKUs
+        """
+        version, fetched = self._read(sku_ids)
+        records = []
+        for sku_id in sku_ids:
+            record = version.get(sku_id) if version is not None else None
+            if record is None and str(sku_id) in fetched:
+                record = dict(fetched[str(sku_id)][0])
+            if record is not None:
+                records.append(record)
+        return records
+
+    def entries(self, sku_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns price, availability and stock of the known SKUs among sku_ids, keyed by SKU id
+        """
+        version, fetched = self._read(sku_ids)
+        entries = version.entries(sku_ids) if version is not None else {}
+        for sku_id, (record, available) in fetched.items():
+            if sku_id not in entries:
+                entries[sku_id] = {'price': _float(record.get('price')), 'available': available,
+                                   'stock': record.get('stock')}
+        return entries
+
+    def refresh(self) -> Optional[CatalogVersion]:
+        """
+        Fetches every SKU the snapshot holds again and publishes a new version if anything changed
+        """
+        version = self._current
+        if version is None:
+            return None
+        sku_ids = version.ids.tolist()
+        fetched: Dict[str, tuple] = {}
+        for start in range(0, len(sku_ids), self.batch_size):
+            fetched.update(self._fetch(sku_ids[start:start + self.batch_size]))
+
+        with self._publish_lock:
+            latest = self._current
+            # Keep SKUs that readers added while the refresh was fetching
+            added = [sku_id for sku_id in latest.ids.tolist() if sku_id not in version.index]
+            rows = [fetched[sku_id] for sku_id in sku_ids if sku_id in fetched]
+            rows += [latest.row(sku_id) for sku_id in added]
+            if len(rows) != len(latest) or any(latest.row(str(record['id'])) != (record, available)
+                                               for record, available in rows):
+                self._publish(self._build(latest.version + 1, rows))
+            return self._current
+
+    def start(self) -> None:
+        """
+        Starts refreshing in a background thread every refresh_interval seconds; called on first use
+        """
+        with self._start_lock:
+            if self._worker is None and self.refresh_interval and not self._stop.is_set():
+                self._worker = threading.Thread(target=self._run, name='catalog-snapshot', daemon=True)
+                self._worker.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def _read(self, sku_ids: Sequence[str]) -> tuple:
+        # Serve known SKUs from the current version and fetch the others in one call
+        version = self._current
+        missing = list(dict.fromkeys(str(sku_id) for sku_id in sku_ids
+                                     if version is None or str(sku_id) not in version.index))
+        fetched: Dict[str, tuple] = {}
+        if missing:
+            self.start()
+            fetched = self._fetch(missing)
+            if fetched:
+                version = self._add(list(fetched.values()))
+        return version, fetched
+
+    def _fetch(self, sku_ids: List[str]) -> Dict[str, tuple]:
+        # Fetch records and resolve the availability of those that do not carry it
+        fetched = {}
+        for record in self.fetch_products(sku_ids):
+            sku_id = str(record['id'])
+            if 'available' in record:
+                available = bool(record['available'])
+            else:
+                available = bool(self.is_available(sku_id)) if self.is_available is not None else False
+            # Copy so later changes to the service's objects cannot leak into a published version
+            fetched[sku_id] = (dict(record), available)
+        return fetched
+
+    def _add(self, rows: List[tuple]) -> Optional[CatalogVersion]:
+        # Publish a version with the new rows appended; returns the version to serve this read from
+        with self._publish_lock:
+            current = self._current
+            if current is not None:
+                rows = [row for row in rows if str(row[0]['id']) not in current.index]
+                if not rows:
+                    return current
+            added = self._build(0, rows)
+            if current is None:
+                version = CatalogVersion(0, added.ids, added.records, added.price, added.available, added.stock,
+                                         added.nbytes)
+            else:
+                version = CatalogVersion(
+                    current.version + 1,
+                    np.concatenate([current.ids, added.ids]),
+                    np.concatenate([current.records, added.records]),
+                    np.concatenate([current.price, added.price]),
+                    np.concatenate([current.available, added.available]),
+                    np.concatenate([current.stock, added.stock]),
+                    current.nbytes + added.nbytes
+                )
+            try:
+                self._publish(version)
+            except MemoryError as error:
+                self.last_error = error
+            return self._current
+
+    def _publish(self, version: CatalogVersion) -> None:
+        if self.max_bytes is not None and version.nbytes > self.max_bytes:
+            raise MemoryError(f"Catalog version {version.version} needs {version.nbytes} bytes, "
+                              f"above the limit of {self.max_bytes}")
+        self._current = version
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as error:
+                # Keep serving the last good version; the next interval retries
+                self.last_error = error
+
+    @staticmethod
+    def _build(version: int, rows: List[tuple]) -> CatalogVersion:
+        # Last record wins when an id appears more than once
+        by_id = {str(record['id']): (record, available) for record, available in rows}
+        ids = np.array(list(by_id), dtype=object)
+        records = np.empty(len(by_id), dtype=object)
+        records[:] = [record for record, _ in by_id.values()]
+        price = np.array([_float(record.get('price')) for record, _ in by_id.values()], dtype=np.float64)
+        available = np.array([available for _, available in by_id.values()], dtype=np.bool_)
+        stock = np.array([_float(record.get('stock')) for record, _ in by_id.values()], dtype=np.float64)
+        return CatalogVersion(version, ids, records, price, available, stock)
+
+def _float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+def _rows_nbytes(*columns: np.ndarray) -> int:
+    # Column buffers plus the objects that object columns point to
+    return sum(column.nbytes + (sum(_deep_sizeof(value) for value in column.tolist()) if column.dtype == object else 0)
+               for column in columns)
+
+def _deep_sizeof(value: Any) -> int:
+    # Size of a record with its keys and values, following nested containers
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_sizeof(key) + _deep_sizeof(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item) for item in value)
+    return size
@@ -1,19 +1,51 @@
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import asyncio
+import threading
+import time
 import torch
-from typing import List, Dict, Any
-from config import MODEL_CONFIG
-from ai.utils.text_preprocessor import preprocess_text
-from ai.rag.contextSynthesizer import synthesize_context
+from typing import TYPE_CHECKING, List, Dict, Any, AsyncIterator, Iterator, Optional
+from src.config import MODEL_CONFIG
+from src.ai.utils.text_preprocessor import preprocess_texts
+from src.ai.rag.contextSynthesizer import synthesize_context
+from src.ai.models.sessionCache import SessionKVCache
+from src.ai.utils.lazyModel import LazyModel
+from src.ai.models.inferenceMode import apply_precision, configure_threads
+from src.ai.models.responseCache import ResponseCache
+from src.ai.utils.metrics import metrics, TOKEN_BUCKETS
 
-# Global variables for the model and tokenizer
-model: AutoModelForCausalLM = None
-tokenizer: AutoTokenizer = None
+# transformers is imported when the model is loaded, not with this module
+if TYPE_CHECKING:
+    from transformers import AutoModelForCausalLM, AutoTokenizer
 
-def load_model() -> tuple[AutoModelForCausalLM, AutoTokenizer]:
+# Per-session key/value cache for the shared prompt prefix of consecutive turns
+session_kv_cache = SessionKVCache(
+    max_sessions=MODEL_CONFIG.get('kv_cache_max_sessions', 256),
+    ttl_seconds=MODEL_CONFIG.get('kv_cache_ttl_seconds', 1800),
+    max_bytes=MODEL_CONFIG.get('kv_cache_max_bytes', 2 * 1024 ** 3)
+)
+
+# Cache of complete responses for repeated prompts, opt-in through response_cache_enabled;
+# only used while decoding is greedy
+response_cache = ResponseCache(
+    max_items=MODEL_CONFIG.get('response_cache_size', 10000),
+    ttl_seconds=MODEL_CONFIG.get('response_cache_ttl_seconds', 86400),
+    path=MODEL_CONFIG.get('response_cache_path')
+) if MODEL_CONFIG.get('response_cache_enabled', False) else None
+
+# Report the hit rates of both caches with the other pipeline caches
+metrics.register_cache('session_kv', session_kv_cache.stats)
+if response_cache is not None:
+    metrics.register_cache('response', response_cache.stats)
+
+def load_model(precision: Optional[str] = None) -> tuple['AutoModelForCausalLM', 'AutoTokenizer']:
     """
     Loads the pre-trained language model and tokenizer
+
+    precision overrides MODEL_CONFIG['precision'] ('fp32', 'bf16' or 'int8').
     """
-    global model, tokenizer
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    
+    # Size the CPU thread pools before any inference work starts
+    configure_threads(MODEL_CONFIG.get('num_threads'), MODEL_CONFIG.get('num_interop_threads'))
     
     # Load the tokenizer using AutoTokenizer.from_pretrained
     tokenizer = AutoTokenizer.from_pretrained(MODEL_CONFIG['model_name'])
@@ -25,35 +57,215 @@ def load_model() -> tuple[AutoModelForCausalLM, AutoTokenizer]:
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model = model.to(device)
     
+    # Convert the model to the configured inference precision
+    model = apply_precision(model, precision or MODEL_CONFIG.get('precision', 'fp32'))
+    model.eval()
+    
     return model, tokenizer
 
-def generate_response(chat_history: List[Dict[str, str]], context: str) -> str:
+def get_model() -> 'AutoModelForCausalLM':
+    """
+    Returns the chat model, loading it on first use
+    """
+    return chat_model.get()[0]
+
+def get_tokenizer() -> 'AutoTokenizer':
+    """
+    Returns the chat tokenizer, loading it on first use
+    """
+    return chat_model.get()[1]
+
+def model_version() -> str:
+    """
+    Identifies everything besides the prompt that determines a greedy response
+    """
+    return ":".join([
+        MODEL_CONFIG['model_name'],
+        str(MODEL_CONFIG.get('model_revision', 'main')),
+        MODEL_CONFIG.get('precision', 'fp32'),
+        str(MODEL_CONFIG['max_length'])
+    ])
+
+def sampling_kwargs() -> Dict[str, Any]:
+    """
+    Returns the sampling arguments for model.generate, empty when decoding is greedy
+    """
+    if not MODEL_CONFIG.get('do_sample', False):
+        return {}
+    kwargs = {'do_sample': True}
+    for name in ('temperature', 'top_k', 'top_p'):
+        if name in MODEL_CONFIG:
+            kwargs[name] = MODEL_CONFIG[name]
+    return kwargs
+
+def generate_response(chat_history: List[Dict[str, str]], context: str, session_id: Optional[str] = None,
+                      use_cache: bool = True) -> str:
     """
     Generates a response based on the chat history and context
+
+    The response is the text generated after the prompt; stream_response yields the
+    same text in pieces.
+
+    When session_id is given, the key/values of the prompt prefix shared with the
+    session's previous turn are reused and only the new part of the prompt is encoded.
+    Greedy responses are served from and stored in the response cache unless use_cache
+    is False; the cache is bypassed whenever sampling is enabled.
     """
-    # Preprocess the chat history and context
-    preprocessed_history = [preprocess_text(msg['content']) for msg in chat_history]
-    preprocessed_context = preprocess_text(context)
-    
     # Construct the input prompt by combining chat history and context
-    prompt = construct_prompt(preprocessed_history, preprocessed_context)
+    prompt = build_prompt(chat_history, context)
+    
+    # Return the cached response for a prompt that was already answered deterministically
+    sampling = sampling_kwargs()
+    cacheable = use_cache and response_cache is not None and not sampling
+    if cacheable:
+        cached = response_cache.get(prompt, model_version())
+        if cached is not None:
+            return cached
     
     # Tokenize the input prompt
+    model, tokenizer = chat_model.get()
     inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+    prompt_length = inputs['input_ids'].shape[1]
     
     # Generate response using the model
-    with torch.no_grad():
-        outputs = model.generate(**inputs, max_length=MODEL_CONFIG['max_length'])
+    with metrics.span('generate'):
+        if session_id is not None and not sampling:
+            generated_ids = list(decode_tokens(inputs['input_ids'], MODEL_CONFIG['max_length'], session_id=session_id))
+        else:
+            with torch.inference_mode():
+                outputs = model.generate(**inputs, max_length=MODEL_CONFIG['max_length'], **sampling)
+            generated_ids = outputs[0][prompt_length:]
+    observe_tokens(prompt_length, len(generated_ids))
     
-    # Decode and post-process the generated response
-    response = tokenizer.decode(outputs[0], skip_special_tokens=True)
+    # Decode and post-process only the generated tokens, as stream_response does
+    response = tokenizer.decode(generated_ids, skip_special_tokens=True)
     final_response = post_process_response(response)
     
+    if cacheable:
+        response_cache.set(prompt, model_version(), final_response)
+    
     return final_response
 
+def stream_response(chat_history: List[Dict[str, str]], context: str,
+                    cancel_event: Optional[threading.Event] = None,
+                    session_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Generates a response incrementally, yielding post-processed text as tokens are produced
+
+    Generation stops early when cancel_event is set or the generator is closed.
+    """
+    # Construct and tokenize the input prompt
+    prompt = build_prompt(chat_history, context)
+    model, tokenizer = chat_model.get()
+    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+    
+    # Decode token by token, emitting only text that can no longer change
+    token_ids: List[int] = []
+    emitted = ""
+    started = time.perf_counter()
+    try:
+        for token_id in decode_tokens(inputs['input_ids'], MODEL_CONFIG['max_length'], cancel_event, session_id):
+            if not token_ids:
+                metrics.observe('time_to_first_token_ms', (time.perf_counter() - started) * 1000.0)
+            token_ids.append(token_id)
+            partial = normalize_response_text(tokenizer.decode(token_ids, skip_special_tokens=True))
+            # Hold back incomplete multi-byte characters until the next token completes them
+            if partial.endswith("\ufffd"):
+                continue
+            if len(partial) > len(emitted) and partial.startswith(emitted):
+                yield partial[len(emitted):]
+                emitted = partial
+    finally:
+        # Count cancelled and abandoned streams too, with the tokens produced so far
+        observe_tokens(inputs['input_ids'].shape[1], len(token_ids))
+    
+    if cancel_event is not None and cancel_event.is_set():
+        return
+    
+    # Emit whatever the final post-processing adds (e.g. closing punctuation)
+    final_response = post_process_response(tokenizer.decode(token_ids, skip_special_tokens=True))
+    if len(final_response) > len(emitted) and final_response.startswith(emitted):
+        yield final_response[len(emitted):]
+
+async def astream_response(chat_history: List[Dict[str, str]], context: str,
+                           session_id: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Async variant of stream_response; cancelling the consumer stops generation
+    """
+    loop = asyncio.get_running_loop()
+    cancel_event = threading.Event()
+    chunks = stream_response(chat_history, context, cancel_event, session_id)
+    finished = object()
+    try:
+        while True:
+            # Run each decoding step off the event loop
+            chunk = await loop.run_in_executor(None, next, chunks, finished)
+            if chunk is finished:
+                break
+            yield chunk
+    finally:
+        cancel_event.set()
+
+def decode_tokens(input_ids: torch.Tensor, max_length: int,
+                  cancel_event: Optional[threading.Event] = None,
+                  session_id: Optional[str] = None) -> Iterator[int]:
+    """
+    Greedily decodes new token ids one at a time using the model's key/value cache
+
+    With a session_id, the prefill starts from the session's cached key/values and
+    the key/values of this prompt are stored for the next turn.
+    """
+    model, tokenizer = chat_model.get()
+    prompt_ids = input_ids[0].tolist()
+    past_key_values, cached_length = None, 0
+    if session_id is not None:
+        past_key_values, cached_length = session_kv_cache.lookup(session_id, prompt_ids)
+    next_input = input_ids[:, cached_length:]
+    length = len(prompt_ids)
+    
+    with torch.inference_mode():
+        while length < max_length:
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            
+            # Run a single decoding step, feeding only the tokens not yet in the cache
+            outputs = model(input_ids=next_input, past_key_values=past_key_values, use_cache=True)
+            past_key_values = outputs.past_key_values
+            
+            # After the prefill step the cache covers exactly the prompt; keep it for the next turn
+            if session_id is not None and length == len(prompt_ids):
+                session_kv_cache.put(session_id, prompt_ids, past_key_values)
+            next_token = outputs.logits[:, -1, :].argmax(dim=-1, keepdim=True)
+            
+            token_id = next_token.item()
+            if token_id == tokenizer.eos_token_id:
+                return
+            yield token_id
+            
+            next_input = next_token
+            length += 1
+
+def observe_tokens(prompt_tokens: int, generated_tokens: int) -> None:
+    """
+    Records the prompt and generated token counts of one generation
+    """
+    metrics.observe('prompt_tokens', prompt_tokens, TOKEN_BUCKETS)
+    metrics.observe('generated_tokens', generated_tokens, TOKEN_BUCKETS)
+
+def build_prompt(chat_history: List[Dict[str, str]], context: str) -> str:
+    """
+    Preprocesses the chat history and context and constructs the model prompt
+    """
+    # Preprocess the history and context in one batch; unchanged messages hit the cache
+    preprocessed = preprocess_texts([msg['content'] for msg in chat_history] + [context])
+    return construct_prompt(preprocessed[:-1], preprocessed[-1])
+
 def construct_prompt(chat_history: List[str], context: str) -> str:
     """
     Constructs the input prompt for the model
+
+    The history comes before the retrieved context: it only grows between turns of a
+    session, so the session key/value cache can reuse everything up to the context.
     """
     # Initialize an empty prompt string
     prompt = ""
@@ -61,22 +273,22 @@ def construct_prompt(chat_history: List[str], context: str) -> str:
     # Add system instructions to the prompt
     prompt += "You are an AI-powered salesperson. Be helpful, professional, and persuasive.\n\n"
     
-    # Add the context to the prompt
-    prompt += f"Context: {context}\n\n"
-    
     # Iterate through the chat history, adding each message to the prompt
     for i, message in enumerate(chat_history):
         role = "Human:" if i % 2 == 0 else "AI:"
         prompt += f"{role} {message}\n"
     
+    # Add the context for this turn after the stable history
+    prompt += f"\nContext: {context}\n\n"
+    
     # Add a prompt for the AI's response
     prompt += "AI:"
     
     return prompt
 
-def post_process_response(response: str) -> str:
+def normalize_response_text(response: str) -> str:
     """
-    Post-processes the generated response
+    Removes artifacts and normalizes whitespace and punctuation in generated text
     """
     # Remove any unwanted artifacts or special tokens
     response = response.replace("<|endoftext|>", "").strip()
@@ -85,11 +297,20 @@ def post_process_response(response: str) -> str:
     response = " ".join(response.split())
     response = response.replace(" .", ".").replace(" ,", ",").replace(" !", "!").replace(" ?", "?")
     
+    return response
+
+def post_process_response(response: str) -> str:
+    """
+    Post-processes the generated response
+    """
+    # Remove artifacts and normalize whitespace and punctuation
+    response = normalize_response_text(response)
+    
     # Ensure the response is coherent and complete
     if not response.endswith((".", "!", "?")):
         response += "."
     
     return response
 
-# Initialize the model and tokenizer
-model, tokenizer = load_model()
\ No newline at end of file
+# The model and tokenizer are loaded on first use, or up front through warmup()
+chat_model = LazyModel('chat', load_model)
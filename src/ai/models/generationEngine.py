@@ -0,0 +1,306 @@
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List, Optional
+import torch
+from src.config import MODEL_CONFIG
+from src.ai.models import chatModel
+from src.ai.models.sessionCache import to_legacy_past
+from src.ai.utils.metrics import metrics, BATCH_SIZE_BUCKETS
+
+# Sentinels for the request queue and the per-request text streams
+_STOP = object()
+_END_OF_STREAM = object()
+
+class GenerationRequest:
+    """
+    Handle for a submitted generation: a future for the full response and a text stream
+    """
+    def __init__(self, prompt_ids: List[int], max_new_tokens: int):
+        self.prompt_ids = prompt_ids
+        self.max_new_tokens = max_new_tokens
+        self.generated_ids: List[int] = []
+        self.future: Future = Future()
+        self._chunks: queue.Queue = queue.Queue()
+        self._emitted = ""
+        self._cancelled = threading.Event()
+
+    def stream(self) -> Iterator[str]:
+        """
+        Yields post-processed response text as tokens are generated
+        """
+        while True:
+            chunk = self._chunks.get()
+            if chunk is _END_OF_STREAM:
+                return
+            yield chunk
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        """
+        Blocks until the full post-processed response is available
+        """
+        return self.future.result(timeout)
+
+    def cancel(self) -> None:
+        """
+        Stops generation at the next decode step, e.g. when the client disconnects
+        """
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _push_token(self, token_id: int) -> None:
+        self.generated_ids.append(token_id)
+        partial = chatModel.normalize_response_text(
+            chatModel.get_tokenizer().decode(self.generated_ids, skip_special_tokens=True)
+        )
+        # Hold back incomplete multi-byte characters until the next token completes them
+        if partial.endswith("\ufffd"):
+            return
+        self._emit(partial)
+
+    def _finish(self) -> None:
+        response = chatModel.post_process_response(
+            chatModel.get_tokenizer().decode(self.generated_ids, skip_special_tokens=True)
+        )
+        if not self.cancelled:
+            self._emit(response)
+        self._chunks.put(_END_OF_STREAM)
+        if not self.future.done():
+            self.future.set_result(response)
+
+    def _fail(self, error: BaseException) -> None:
+        self._chunks.put(_END_OF_STREAM)
+        if not self.future.done():
+            self.future.set_exception(error)
+
+    def _emit(self, text: str) -> None:
+        if len(text) > len(self._emitted) and text.startswith(self._emitted):
+            self._chunks.put(text[len(self._emitted):])
+            self._emitted = text
+
+class _Sequence:
+    """
+    Decoding state of one request inside the running batch
+    """
+    def __init__(self, request: GenerationRequest, past_key_values: Any, length: int, next_token: int):
+        self.request = request
+        self.past_key_values = past_key_values
+        self.length = length
+        self.next_token = next_token
+
+def _pad_left(tensor: torch.Tensor, pad: int) -> torch.Tensor:
+    if pad == 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[-2] = pad
+    return torch.cat([tensor.new_zeros(shape), tensor], dim=-2)
+
+class GenerationEngine:
+    """
+    Continuous-batching generation engine for the chat model
+
+    Sequences join the running batch as soon as a slot is free and leave it as soon
+    as they finish, so a long generation does not hold back shorter ones. The key/value
+    caches of the running sequences are left-padded to a common length and masked.
+    """
+    def __init__(self, max_batch_size: int = 8, max_queue_size: int = 64,
+                 default_max_new_tokens: Optional[int] = None):
+        self.max_batch_size = max_batch_size
+        self.default_max_new_tokens = default_max_new_tokens
+        self._waiting: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._active: List[_Sequence] = []
+        self._batch_past: Any = None
+        self._batch_length = 0
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopped = False
+
+    def submit(self, chat_history: List[Dict[str, str]], context: str,
+               max_new_tokens: Optional[int] = None) -> GenerationRequest:
+        """
+        Queues a generation and returns a handle with a future and a text stream
+
+        Raises RuntimeError when the engine's queue is full.
+        """
+        if self._stopped:
+            raise RuntimeError("Generation engine has been shut down")
+        self._ensure_started()
+
+        # Build and tokenize the prompt the same way generate_response does
+        prompt = chatModel.build_prompt(chat_history, context)
+        prompt_ids = chatModel.get_tokenizer()(prompt)['input_ids']
+        if max_new_tokens is None:
+            max_new_tokens = self.default_max_new_tokens or max(MODEL_CONFIG['max_length'] - len(prompt_ids), 0)
+
+        request = GenerationRequest(prompt_ids, max_new_tokens)
+        try:
+            self._waiting.put_nowait(request)
+        except queue.Full:
+            raise RuntimeError("Generation queue is full")
+        return request
+
+    def shutdown(self) -> None:
+        """
+        Stops the engine once the running sequences have been retired
+        """
+        self._stopped = True
+        if self._worker is not None:
+            self._waiting.put(_STOP)
+            self._worker.join()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of running and queued sequences
+        """
+        return {'active': len(self._active), 'waiting': self._waiting.qsize()}
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='generation-engine', daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        stop = False
+        while True:
+            stop = self._admit() or stop
+            if self._active:
+                try:
+                    with torch.inference_mode(), metrics.span('generation_step'):
+                        self._step()
+                except Exception as error:
+                    for sequence in self._active:
+                        sequence.request._fail(error)
+                    self._active = []
+                    self._batch_past = None
+            elif stop:
+                return
+
+    def _admit(self) -> bool:
+        # Block only when idle; otherwise take whatever is already waiting
+        block = not self._active and not self._stopped
+        while len(self._active) < self.max_batch_size:
+            try:
+                request = self._waiting.get(block=block)
+            except queue.Empty:
+                return False
+            if request is _STOP:
+                return True
+            block = False
+            if request.cancelled:
+                request._finish()
+                continue
+            try:
+                with torch.inference_mode(), metrics.span('prefill'):
+                    self._prefill(request)
+            except Exception as error:
+                request._fail(error)
+        return False
+
+    def _prefill(self, request: GenerationRequest) -> None:
+        model = chatModel.get_model()
+        input_ids = torch.tensor([request.prompt_ids], device=model.device)
+        outputs = model(input_ids=input_ids, use_cache=True)
+        token_id = int(outputs.logits[0, -1, :].argmax())
+        sequence = _Sequence(request, to_legacy_past(outputs.past_key_values), len(request.prompt_ids), token_id)
+
+        if not self._accept_token(sequence, token_id):
+            request._finish()
+            return
+
+        # Membership changes: split the batch back into per-sequence caches before adding
+        self._unbatch()
+        self._active.append(sequence)
+
+    def _step(self) -> None:
+        model = chatModel.get_model()
+        if self._batch_past is None:
+            self._rebuild_batch()
+
+        # Each sequence feeds its pending token at its own position, with its padding masked out
+        batch_size = len(self._active)
+        metrics.observe('generation_batch_size', batch_size, BATCH_SIZE_BUCKETS)
+        input_ids = torch.tensor([[s.next_token] for s in self._active], device=model.device)
+        position_ids = torch.tensor([[s.length] for s in self._active], device=model.device)
+        attention_mask = torch.zeros((batch_size, self._batch_length + 1), dtype=torch.long, device=model.device)
+        for i, sequence in enumerate(self._active):
+            attention_mask[i, self._batch_length - sequence.length:] = 1
+
+        outputs = model(
+            input_ids=input_ids,
+            past_key_values=self._batch_past,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            use_cache=True
+        )
+        self._batch_past = to_legacy_past(outputs.past_key_values)
+        self._batch_length += 1
+        next_tokens = outputs.logits[:, -1, :].argmax(dim=-1).tolist()
+
+        # Advance every sequence and retire the ones that finished
+        finished = []
+        for sequence, token_id in zip(self._active, next_tokens):
+            sequence.length += 1
+            sequence.next_token = token_id
+            if not self._accept_token(sequence, token_id):
+                finished.append(sequence)
+
+        if finished:
+            self._unbatch()
+            self._active = [s for s in self._active if s not in finished]
+            for sequence in finished:
+                sequence.request._finish()
+
+    def _accept_token(self, sequence: _Sequence, token_id: int) -> bool:
+        request = sequence.request
+        if request.cancelled or token_id == chatModel.get_tokenizer().eos_token_id:
+            return False
+        request._push_token(token_id)
+        if len(request.generated_ids) >= request.max_new_tokens:
+            return False
+        return sequence.length + 1 < MODEL_CONFIG['max_length']
+
+    def _rebuild_batch(self) -> None:
+        # Left-pad every sequence's cache to the longest one and stack them along the batch axis
+        self._batch_length = max(s.length for s in self._active)
+        num_layers = len(self._active[0].past_key_values)
+        layers = []
+        for layer in range(num_layers):
+            tensors = []
+            for position in range(len(self._active[0].past_key_values[layer])):
+                tensors.append(torch.cat([
+                    _pad_left(s.past_key_values[layer][position], self._batch_length - s.length)
+                    for s in self._active
+                ], dim=0))
+            layers.append(tuple(tensors))
+        self._batch_past = tuple(layers)
+        for sequence in self._active:
+            sequence.past_key_values = None
+
+    def _unbatch(self) -> None:
+        # Slice each sequence's unpadded cache back out of the batched cache
+        if self._batch_past is None:
+            return
+        for i, sequence in enumerate(self._active):
+            pad = self._batch_length - sequence.length
+            sequence.past_key_values = tuple(
+                tuple(tensor[i:i + 1, :, pad:, :] for tensor in layer)
+                for layer in self._batch_past
+            )
+        self._batch_past = None
+
+# Shared engine instance; the worker thread starts on the first submit
+generation_engine = GenerationEngine(
+    max_batch_size=MODEL_CONFIG.get('max_batch_size', 8),
+    max_queue_size=MODEL_CONFIG.get('max_queue_size', 64)
+)
+
+def submit(chat_history: List[Dict[str, str]], context: str,
+           max_new_tokens: Optional[int] = None) -> GenerationRequest:
+    """
+    Submits a chat generation to the shared continuous-batching engine
+    """
+    return generation_engine.submit(chat_history, context, max_new_tokens)
@@ -0,0 +1,71 @@
+import gc
+import time
+import torch
+from typing import Any, Dict, List, Sequence
+from src.ai.models.chatModel import load_model
+from src.ai.models.inferenceMode import model_size_bytes
+
+def benchmark_inference(prompts: List[str], precisions: Sequence[str] = ('fp32', 'int8', 'bf16'),
+                        max_new_tokens: int = 32) -> Dict[str, Dict[str, Any]]:
+    """
+    Compares inference precisions of the chat model against the fp32 baseline
+
+    Args:
+        prompts (List[str]): Prompts to complete greedily
+        precisions (Sequence[str]): Precisions to measure; fp32 is always measured first
+        max_new_tokens (int): Number of tokens to generate per prompt
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Per precision, generation throughput in tokens/sec,
+        weight memory in bytes, and agreement of the greedy outputs with fp32 as the
+        share of matching token positions and of identical completions
+    """
+    baseline = None
+    results = {}
+    for precision in ['fp32'] + [precision for precision in precisions if precision != 'fp32']:
+        # Load a fresh copy per precision so conversions never leak into the next run
+        model, tokenizer = load_model(precision)
+        outputs, seconds = _generate_greedy(model, tokenizer, prompts, max_new_tokens)
+        generated_tokens = sum(len(output) for output in outputs)
+        if baseline is None:
+            baseline = outputs
+
+        results[precision] = {
+            'tokens_per_second': generated_tokens / seconds if seconds else 0.0,
+            'weights_bytes': model_size_bytes(model),
+            'token_agreement': _token_agreement(baseline, outputs),
+            'exact_match': sum(a == b for a, b in zip(baseline, outputs)) / max(len(prompts), 1)
+        }
+
+        del model
+        gc.collect()
+
+    return {precision: results[precision] for precision in precisions if precision in results}
+
+def _generate_greedy(model, tokenizer, prompts: List[str], max_new_tokens: int) -> tuple:
+    # Generate one prompt at a time so padding never affects the comparison
+    outputs = []
+    seconds = 0.0
+    with torch.inference_mode():
+        for prompt in prompts:
+            inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+            prompt_length = inputs['input_ids'].shape[1]
+            started = time.perf_counter()
+            generated = model.generate(
+                **inputs,
+                do_sample=False,
+                max_length=prompt_length + max_new_tokens,
+                pad_token_id=tokenizer.eos_token_id
+            )
+            seconds += time.perf_counter() - started
+            outputs.append(generated[0, prompt_length:].tolist())
+    return outputs, seconds
+
+def _token_agreement(baseline: List[List[int]], outputs: List[List[int]]) -> float:
+    # Share of token positions where both completions agree, counting length differences as mismatches
+    matches = 0
+    positions = 0
+    for expected, actual in zip(baseline, outputs):
+        matches += sum(a == b for a, b in zip(expected, actual))
+        positions += max(len(expected), len(actual))
+    return matches / positions if positions else 1.0
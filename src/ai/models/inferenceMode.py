@@ -0,0 +1,82 @@
+import torch
+from torch import nn
+from typing import Optional
+
+# Supported values of MODEL_CONFIG['precision']
+PRECISIONS = ('fp32', 'bf16', 'int8')
+
+def configure_threads(num_threads: Optional[int] = None, num_interop_threads: Optional[int] = None) -> None:
+    """
+    Sets the intra-op and inter-op thread pools used for CPU inference
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads:
+        # Only allowed before the inter-op pool has started; keep the current size otherwise
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError:
+            pass
+
+def apply_precision(model: nn.Module, precision: str) -> nn.Module:
+    """
+    Converts a model to the given inference precision
+
+    'int8' applies dynamic int8 quantization to the linear layers and only runs on
+    CPU; 'bf16' casts the weights to bfloat16; 'fp32' leaves the model unchanged.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+
+    if precision == 'bf16':
+        return model.to(torch.bfloat16)
+
+    if precision == 'int8':
+        if next(model.parameters()).device.type != 'cpu':
+            raise ValueError("int8 dynamic quantization is only supported on CPU")
+        # GPT-style models implement their projections as Conv1D, which quantize_dynamic skips
+        convert_conv1d_to_linear(model)
+        return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    return model
+
+def convert_conv1d_to_linear(model: nn.Module) -> nn.Module:
+    """
+    Replaces transformers Conv1D layers in place with equivalent nn.Linear layers
+    """
+    conv1d = _conv1d_class()
+    for name, module in list(model.named_children()):
+        if isinstance(module, conv1d):
+            # Conv1D computes x @ weight + bias with weight shaped (in_features, out_features)
+            in_features, out_features = module.weight.shape
+            linear = nn.Linear(in_features, out_features, device=module.weight.device, dtype=module.weight.dtype)
+            with torch.no_grad():
+                linear.weight.copy_(module.weight.t())
+                linear.bias.copy_(module.bias)
+            setattr(model, name, linear)
+        else:
+            convert_conv1d_to_linear(module)
+    return model
+
+def model_size_bytes(model: nn.Module) -> int:
+    """
+    Returns the size of the model's weights, including packed quantized weights
+    """
+    total = 0
+    seen = set()
+    for value in model.state_dict().values():
+        # Quantized linear layers store (weight, bias) tuples of packed parameters
+        for tensor in (value if isinstance(value, tuple) else (value,)):
+            # Count tied weights (e.g. shared input and output embeddings) once
+            if isinstance(tensor, torch.Tensor) and tensor.data_ptr() not in seen:
+                seen.add(tensor.data_ptr())
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+def _conv1d_class() -> type:
+    # transformers is imported on first conversion rather than with this module
+    try:
+        from transformers.pytorch_utils import Conv1D
+    except ImportError:
+        from transformers.modeling_utils import Conv1D
+    return Conv1D
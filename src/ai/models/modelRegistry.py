@@ -0,0 +1,132 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import torch
+from torch import nn
+
+logger = logging.getLogger(__name__)
+
+def load_weights(weights_path: str, mmap: bool = False) -> Dict[str, Any]:
+    """
+    Loads a state dict from disk, optionally memory-mapping the tensor storage
+    """
+    if mmap:
+        try:
+            # Memory-mapped loading keeps the tensor data in the OS page cache
+            return torch.load(weights_path, map_location='cpu', mmap=True, weights_only=True)
+        except TypeError:
+            # Older torch releases do not support mmap; fall back to a regular load
+            pass
+    return torch.load(weights_path, map_location='cpu')
+
+class ModelHandle:
+    """
+    Versioned reference to a resident model
+    """
+    def __init__(self, name: str, version: int, model: nn.Module, source_stamp: Optional[tuple]):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.source_stamp = source_stamp
+        self.loaded_at = time.time()
+
+    def __repr__(self) -> str:
+        return f"ModelHandle(name={self.name!r}, version={self.version})"
+
+class ModelRegistry:
+    """
+    Keeps models resident in memory and hot-swaps them when their weights file changes
+
+    A failed hot-swap (e.g. a weights file that is missing or still being written)
+    is logged and the resident version keeps serving; the swap is retried after
+    the next check_interval. Load errors only propagate when no version is resident.
+    """
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+        self._loaders: Dict[str, Callable[[], nn.Module]] = {}
+        self._watch_paths: Dict[str, Optional[str]] = {}
+        self._handles: Dict[str, ModelHandle] = {}
+        self._last_checked: Dict[str, float] = {}
+        self.last_errors: Dict[str, BaseException] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], nn.Module], watch_path: Optional[str] = None) -> None:
+        """
+        Registers a model loader and the weights file that triggers a reload when it changes
+        """
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._watch_paths[name] = watch_path
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> ModelHandle:
+        """
+        Returns the current handle for a model, loading or hot-swapping it if needed
+        """
+        handle = self._handles.get(name)
+        if handle is not None and not self._is_stale(name, handle):
+            return handle
+        return self._load(name)
+
+    def reload(self, name: str) -> ModelHandle:
+        """
+        Forces a reload of the model regardless of its weights file
+        """
+        return self._load(name, force=True)
+
+    def versions(self) -> Dict[str, int]:
+        """
+        Returns the currently resident version of every loaded model
+        """
+        return {name: handle.version for name, handle in self._handles.items()}
+
+    def _is_stale(self, name: str, handle: ModelHandle) -> bool:
+        # Throttle filesystem checks so the hot path does not stat on every call
+        now = time.monotonic()
+        if now - self._last_checked.get(name, 0.0) < self.check_interval:
+            return False
+        self._last_checked[name] = now
+        return self._source_stamp(name) != handle.source_stamp
+
+    def _source_stamp(self, name: str) -> Optional[tuple]:
+        watch_path = self._watch_paths.get(name)
+        if not watch_path:
+            return None
+        try:
+            stat = os.stat(watch_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, name: str, force: bool = False) -> ModelHandle:
+        if name not in self._loaders:
+            raise KeyError(f"Model '{name}' is not registered")
+
+        with self._locks[name]:
+            # Another thread may have completed the load while we were waiting
+            current = self._handles.get(name)
+            stamp = self._source_stamp(name)
+            if current is not None and not force and current.source_stamp == stamp:
+                return current
+
+            # Build the new model outside of the serving path and swap the handle atomically
+            try:
+                model = self._loaders[name]()
+            except Exception as error:
+                if current is None:
+                    raise
+                # Keep serving the resident version; the next check retries the swap
+                logger.exception("Reloading model '%s' failed, keeping version %d", name, current.version)
+                self.last_errors[name] = error
+                self._last_checked[name] = time.monotonic()
+                return current
+            self.last_errors.pop(name, None)
+            version = current.version + 1 if current is not None else 1
+            handle = ModelHandle(name, version, model, stamp)
+            self._handles[name] = handle
+            self._last_checked[name] = time.monotonic()
+
+        return handle
@@ -1,15 +1,26 @@
 import torch
 from torch import nn
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from @.config import QUOTE_MODEL_CONFIG
 from @.ai.utils.data_preprocessor import preprocess_quote_data
 from @.services.skuService import SKUService
 from @.services.pricingService import PricingService
+from src.ai.models.modelRegistry import ModelRegistry, load_weights
+from src.ai.utils.batchScheduler import MicroBatchScheduler
+from src.ai.utils.lazyModel import register_warmup
+from src.ai.models.quoteValidator import BulkQuoteValidator
+from src.ai.models.catalogSnapshot import CatalogSnapshot
 
 # Initialize global services
 sku_service = SKUService()
 pricing_service = PricingService()
 
+# Name under which the quote model is kept in the model registry
+QUOTE_MODEL_NAME = 'quote'
+
+# Registry that keeps the quote model resident between requests
+quote_model_registry = ModelRegistry(check_interval=QUOTE_MODEL_CONFIG.get('reload_check_interval', 5.0))
+
 def load_quote_model() -> nn.Module:
     """
     Loads the pre-trained quote generation and optimization model
@@ -17,16 +28,45 @@ def load_quote_model() -> nn.Module:
     # Load the model architecture based on QUOTE_MODEL_CONFIG
     model = QuoteModel(QUOTE_MODEL_CONFIG)
     
-    # Load pre-trained weights if available
+    # Load pre-trained weights if available, memory-mapping them when configured
     if QUOTE_MODEL_CONFIG.get('pretrained_weights'):
-        model.load_state_dict(torch.load(QUOTE_MODEL_CONFIG['pretrained_weights']))
+        mmap = QUOTE_MODEL_CONFIG.get('mmap_weights', False)
+        state_dict = load_weights(QUOTE_MODEL_CONFIG['pretrained_weights'], mmap=mmap)
+        model.load_state_dict(state_dict)
     
     # Move the model to GPU if available
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     model = model.to(device)
+    model.eval()
     
     return model
 
+def get_quote_model() -> nn.Module:
+    """
+    Returns the resident quote model, reloading it if its weights file changed
+    """
+    return quote_model_registry.get(QUOTE_MODEL_NAME).model
+
+def run_quote_batch(inputs: List[torch.Tensor]) -> List[torch.Tensor]:
+    """
+    Runs a batch of quote model inputs through a single forward pass
+    """
+    model = get_quote_model()
+    outputs: List[torch.Tensor] = [None] * len(inputs)
+    
+    # Group inputs by shape so that each group can be stacked into one tensor
+    groups: Dict[tuple, List[int]] = {}
+    for i, model_input in enumerate(inputs):
+        groups.setdefault(tuple(model_input.shape), []).append(i)
+    
+    with torch.no_grad():
+        for indices in groups.values():
+            batch_output = model(torch.stack([inputs[i] for i in indices]))
+            for i, output in zip(indices, batch_output.unbind(0)):
+                outputs[i] = output
+    
+    return outputs
+
 def generate_quote(customer_requirements: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generates a quote based on customer requirements and context
@@ -34,12 +74,15 @@ def generate_quote(customer_requirements: Dict[str, Any], context: Dict[str, Any
     # Preprocess customer requirements and context
     preprocessed_data = preprocess_quote_data(customer_requirements, context)
     
-    # Retrieve relevant product information from sku_service
-    product_info = sku_service.get_product_info(preprocessed_data['product_ids'])
+    # Retrieve relevant product information from the catalog snapshot, or sku_service without one
+    product_ids = preprocessed_data['product_ids']
+    if catalog_snapshot is not None:
+        product_info = catalog_snapshot.products(product_ids)
+    else:
+        product_info = sku_service.get_product_info(product_ids)
     
-    # Generate initial quote using the quote model
-    model = load_quote_model()
-    initial_quote = model(torch.tensor(preprocessed_data['model_input']))
+    # Generate initial quote through the micro-batching scheduler
+    initial_quote = quote_batch_scheduler(torch.tensor(preprocessed_data['model_input']))
     
     # Apply pricing rules and optimize using pricing_service
     optimized_quote = pricing_service.apply_pricing_rules(initial_quote.todict())
@@ -77,36 +120,63 @@ def optimize_quote(quote: Dict[str, Any], optimization_params: Dict[str, Any]) -
 def validate_quote(quote: Dict[str, Any]) -> Dict[str, Any]:
     """
     Validates a generated or optimized quote
+
+    Checks product availability, then runs the pricing_service checks.
     """
-    validation_results = {
-        'is_valid': True,
-        'issues': [],
-        'warnings': []
-    }
-    
-    # Check product availability and validity
-    for product in quote['products']:
-        if not sku_service.is_product_available(product['id']):
-            validation_results['is_valid'] = False
-            validation_results['issues'].append(f"Product {product['id']} is not available")
+    _, validation_results = next(quote_validator.validate([quote], apply_quote_rules=True))
+    return validation_results
+
+def check_pricing_rules(quote: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """
+    Runs the pricing_service checks on one quote, returning its issues and warnings
+    """
+    issues: List[str] = []
+    warnings: List[str] = []
     
     # Verify pricing calculations
     if not pricing_service.verify_pricing(quote['pricing']):
-        validation_results['is_valid'] = False
-        validation_results['issues'].append("Pricing calculations are incorrect")
+        issues.append("Pricing calculations are incorrect")
     
     # Ensure compliance with business rules and constraints
     compliance_check = pricing_service.check_compliance(quote)
     if not compliance_check['compliant']:
-        validation_results['is_valid'] = False
-        validation_results['issues'].extend(compliance_check['violations'])
+        issues.extend(compliance_check['violations'])
     
     # Validate discounts and promotions
     discount_check = pricing_service.validate_discounts(quote['pricing'])
     if not discount_check['valid']:
-        validation_results['warnings'].extend(discount_check['warnings'])
+        warnings.extend(discount_check['warnings'])
     
-    return validation_results
+    return issues, warnings
+
+def validate_quotes(quotes: Iterable[Dict[str, Any]], changed_skus: Optional[Iterable[str]] = None,
+                    check_pricing: bool = False) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Revalidates many quotes against current availability and prices, yielding (quote, results) pairs
+
+    With changed_skus, only quotes containing one of those SKUs are revalidated.
+    check_pricing also runs the pricing_service checks of validate_quote, at three
+    pricing_service calls per quote.
+    """
+    return quote_validator.validate(quotes, changed_skus, apply_quote_rules=check_pricing)
+
+def lookup_catalog(sku_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetches price and availability for many SKUs, keyed by SKU id
+
+    SKUs are served from the catalog snapshot, which fetches those it does not hold
+    from sku_service in one call. Without a snapshot all of them are fetched. Products
+    whose record does not say whether they are available are checked with
+    sku_service.is_product_available.
+    """
+    if catalog_snapshot is not None:
+        return catalog_snapshot.entries(sku_ids)
+    products = {}
+    for product in sku_service.get_product_info(sku_ids):
+        sku_id = str(product['id'])
+        available = product['available'] if 'available' in product else sku_service.is_product_available(sku_id)
+        products[sku_id] = {**product, 'available': bool(available)}
+    return products
 
 class QuoteModel(nn.Module):
     """
@@ -134,5 +204,37 @@ class QuoteModel(nn.Module):
 sku_service = SKUService()
 pricing_service = PricingService()
 
-# Load the pre-trained quote model
-quote_model = load_quote_model()
\ No newline at end of file
+# Register the pre-trained quote model; the registry loads it on first use, or up front through warmup()
+quote_model_registry.register(
+    QUOTE_MODEL_NAME,
+    load_quote_model,
+    watch_path=QUOTE_MODEL_CONFIG.get('pretrained_weights')
+)
+register_warmup(QUOTE_MODEL_NAME, get_quote_model)
+
+# In-process catalog snapshot that keeps product lookups off the quote and validation hot paths
+catalog_snapshot = CatalogSnapshot(
+    sku_service.get_product_info,
+    sku_service.is_product_available,
+    refresh_interval=QUOTE_MODEL_CONFIG.get('catalog_refresh_interval', 30.0),
+    max_bytes=QUOTE_MODEL_CONFIG.get('catalog_max_bytes', 256 * 1024 ** 2),
+    batch_size=QUOTE_MODEL_CONFIG.get('catalog_batch_size', 1000)
+) if QUOTE_MODEL_CONFIG.get('catalog_snapshot', True) else None
+
+# Validation of single quotes and bulk revalidation of open quotes when prices or stock change
+quote_validator = BulkQuoteValidator(
+    lookup_catalog,
+    quote_rules=[check_pricing_rules],
+    batch_size=QUOTE_MODEL_CONFIG.get('validation_batch_size', 5000),
+    line_rules=QUOTE_MODEL_CONFIG.get('validate_line_rules', False),
+    max_discount=QUOTE_MODEL_CONFIG.get('max_discount'),
+    warn_discount=QUOTE_MODEL_CONFIG.get('warn_discount')
+)
+
+# Batch concurrent quote requests into shared forward passes
+quote_batch_scheduler = MicroBatchScheduler(
+    run_quote_batch,
+    max_batch_size=QUOTE_MODEL_CONFIG.get('max_batch_size', 32),
+    max_wait_ms=QUOTE_MODEL_CONFIG.get('max_batch_wait_ms', 5.0),
+    name='quote-batch-scheduler'
+)
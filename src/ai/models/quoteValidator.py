@@ -0,0 +1,233 @@
+import numpy as np
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Bulk catalog lookup: SKU ids -> {sku_id: {'price': list unit price, 'available': bool, 'stock': optional int}}
+CatalogLookup = Callable[[List[str]], Dict[str, Dict[str, Any]]]
+
+# Rule evaluated on one whole quote: quote -> (issues, warnings)
+QuoteRule = Callable[[Dict[str, Any]], Tuple[List[str], List[str]]]
+
+class QuoteLines:
+    """
+    Line items of a batch of quotes as flat, aligned arrays
+
+    Every product of a quote is a line, in order, priced by the first unused pricing
+    item with its product_id; pricing items for products the quote does not list
+    follow as further lines. Pricing items without a product_id are not lines and
+    are kept in missing_ids as (quote, item position) pairs. Products without a
+    pricing item have no price and are marked unpriced.
+    """
+    def __init__(self, quotes: List[Dict[str, Any]]):
+        self.quotes = quotes
+        self.missing_ids: List[Tuple[int, int]] = []
+        quote_index: List[int] = []
+        skus: List[str] = []
+        quantities: List[float] = []
+        prices: List[float] = []
+        listed: List[bool] = []
+        priced: List[bool] = []
+        item_sums: List[float] = []
+        for i, quote in enumerate(quotes):
+            items = quote.get('pricing', {}).get('items', [])
+            items_by_id: Dict[str, List[Dict[str, Any]]] = {}
+            for position, item in enumerate(items):
+                if item.get('product_id') is None:
+                    self.missing_ids.append((i, position))
+                else:
+                    items_by_id.setdefault(str(item['product_id']), []).append(item)
+            item_sums.append(sum(item.get('price') or 0.0 for item in items))
+
+            for product in quote.get('products', []):
+                sku = str(product['id'])
+                item = items_by_id[sku].pop(0) if items_by_id.get(sku) else {}
+                quote_index.append(i)
+                skus.append(sku)
+                quantities.append(item.get('quantity', product.get('quantity', 1)))
+                prices.append(_price(item))
+                listed.append(True)
+                priced.append(bool(item))
+            for sku, unused in items_by_id.items():
+                for item in unused:
+                    quote_index.append(i)
+                    skus.append(sku)
+                    quantities.append(item.get('quantity', 1))
+                    prices.append(_price(item))
+                    listed.append(False)
+                    priced.append(True)
+
+        self.quote_index = np.array(quote_index, dtype=np.int64)
+        self.skus = np.array(skus, dtype=object)
+        self.quantities = np.array(quantities, dtype=np.float64)
+        self.prices = np.array(prices, dtype=np.float64)
+        self.listed = np.array(listed, dtype=np.bool_)
+        self.priced = np.array(priced, dtype=np.bool_)
+        self.item_sums = np.array(item_sums, dtype=np.float64)
+        self.totals = np.array([quote.get('total', np.nan) for quote in quotes], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.skus)
+
+class BulkQuoteValidator:
+    """
+    Revalidates many quotes at once against current prices and availability
+
+    The distinct SKUs of a batch are fetched with one catalog lookup and the line
+    checks are evaluated over all line items of the batch with array operations.
+    By default a line check only finds the listed products that are unknown or
+    unavailable, as validate_quote always did. With line_rules the validator also
+    checks stock, price and quantity sanity, prices above list, quote totals and,
+    when max_discount or warn_discount is given, the discount limits.
+
+    quote_rules run on each quote for the rules that only exist per quote, such as
+    the pricing service checks. They cost calls per quote, so validate runs them
+    only when asked to.
+    """
+    def __init__(self, catalog_lookup: CatalogLookup, quote_rules: Sequence[QuoteRule] = (),
+                 batch_size: int = 5000, line_rules: bool = False, max_discount: Optional[float] = None,
+                 warn_discount: Optional[float] = None, tolerance: float = 0.01):
+        self.catalog_lookup = catalog_lookup
+        self.quote_rules = list(quote_rules)
+        self.batch_size = batch_size
+        self.line_rules = line_rules
+        self.max_discount = max_discount
+        self.warn_discount = warn_discount
+        self.tolerance = tolerance
+
+    def validate(self, quotes: Iterable[Dict[str, Any]], changed_skus: Optional[Iterable[str]] = None,
+                 apply_quote_rules: bool = False) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Yields (quote, validation results) pairs batch by batch
+
+        With changed_skus, only quotes containing at least one of those SKUs are
+        revalidated; the others are skipped without a catalog lookup. quote_rules
+        run only with apply_quote_rules.
+        """
+        changed = np.array(sorted({str(sku) for sku in changed_skus}), dtype=object) if changed_skus is not None else None
+        batch: List[Dict[str, Any]] = []
+        for quote in quotes:
+            batch.append(quote)
+            if len(batch) >= self.batch_size:
+                yield from self._validate_batch(batch, changed, apply_quote_rules)
+                batch = []
+        if batch:
+            yield from self._validate_batch(batch, changed, apply_quote_rules)
+
+    def _validate_batch(self, quotes: List[Dict[str, Any]], changed: Optional[np.ndarray],
+                        apply_quote_rules: bool) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        lines = QuoteLines(quotes)
+
+        # Keep only the quotes that touch a changed SKU
+        if changed is not None:
+            touched = np.bincount(lines.quote_index[np.isin(lines.skus, changed)], minlength=len(quotes)) > 0
+            if not touched.any():
+                return
+            if not touched.all():
+                quotes = [quote for quote, keep in zip(quotes, touched) if keep]
+                lines = QuoteLines(quotes)
+
+        results = [{'is_valid': True, 'issues': [], 'warnings': []} for _ in quotes]
+        if len(lines):
+            self._check_lines(lines, results)
+        for i, position in lines.missing_ids:
+            results[i]['is_valid'] = False
+            results[i]['issues'].append(f"Pricing item {position} has no product id")
+        if self.line_rules:
+            self._check_totals(lines, results)
+
+        for quote, result in zip(quotes, results):
+            for rule in (self.quote_rules if apply_quote_rules else ()):
+                issues, warnings = rule(quote)
+                if issues:
+                    # Skip issues a line check already reported for this quote
+                    reported = set(result['issues'])
+                    result['is_valid'] = False
+                    result['issues'].extend(issue for issue in issues if issue not in reported)
+                result['warnings'].extend(warnings)
+            yield quote, result
+
+    def _check_lines(self, lines: QuoteLines, results: List[Dict[str, Any]]) -> None:
+        # One catalog lookup for the distinct SKUs, then gather catalog columns per line
+        distinct_skus, inverse = np.unique(lines.skus, return_inverse=True)
+        catalog = self.catalog_lookup(distinct_skus.tolist())
+        entries = [catalog.get(sku) for sku in distinct_skus]
+        known = np.array([entry is not None for entry in entries])[inverse]
+        # Availability fails closed: an entry that does not say it is available is not
+        available = np.array([bool(entry and entry.get('available', False)) for entry in entries])[inverse]
+
+        if not self.line_rules:
+            issues = [(lines.listed & ~(known & available), "Product {sku} is not available")]
+            self._report(issues, lines, results)
+            return
+
+        list_prices = np.array([_float(entry.get('price')) if entry else np.nan for entry in entries],
+                               dtype=np.float64)[inverse]
+        stock = np.array([entry.get('stock', np.inf) if entry and entry.get('stock') is not None else np.inf
+                          for entry in entries], dtype=np.float64)[inverse]
+
+        # Evaluate every rule over all line items of the batch
+        list_totals = list_prices * lines.quantities
+        with np.errstate(divide='ignore', invalid='ignore'):
+            discounts = np.where(list_totals > 0, 1.0 - lines.prices / list_totals, 0.0)
+        unknown = ~known
+        unavailable = known & ~available
+        over_stock = known & available & (lines.quantities > stock)
+        # Products without a pricing item have no price to check
+        invalid_price = lines.priced & (~np.isfinite(lines.prices) | (lines.prices < 0))
+        invalid_quantity = lines.quantities <= 0
+        priced = known & lines.priced & ~invalid_price & np.isfinite(list_totals)
+        below_list = priced & (discounts > self.max_discount + self.tolerance if self.max_discount is not None else False)
+        large_discount = priced & ~below_list & (discounts > self.warn_discount if self.warn_discount is not None else False)
+        above_list = priced & (lines.prices > list_totals * (1.0 + self.tolerance) + self.tolerance)
+
+        # Only lines that broke a rule are turned into messages
+        issues = [
+            (unknown, "Product {sku} does not exist"),
+            (unavailable, "Product {sku} is not available"),
+            (over_stock, "Product {sku}: quantity {quantity:g} exceeds stock of {stock:g}"),
+            (invalid_price, "Product {sku} has an invalid price"),
+            (invalid_quantity, "Product {sku} has an invalid quantity"),
+            (below_list, "Product {sku} is discounted {discount:.0%}, above the allowed maximum"),
+            (above_list, "Product {sku} is priced {price:.2f} above its list price of {list_total:.2f}")
+        ]
+        self._report(issues, lines, results, list_totals, discounts, stock)
+
+        for i in np.flatnonzero(large_discount):
+            results[lines.quote_index[i]]['warnings'].append(
+                self._format("Product {sku} is discounted {discount:.0%}", lines, i, list_totals, discounts, stock)
+            )
+
+    def _report(self, issues: List[Tuple[np.ndarray, str]], lines: QuoteLines, results: List[Dict[str, Any]],
+                list_totals: Optional[np.ndarray] = None, discounts: Optional[np.ndarray] = None,
+                stock: Optional[np.ndarray] = None) -> None:
+        # Lines are visited in order, so each quote lists its issues in product order
+        for i in np.flatnonzero(np.logical_or.reduce([mask for mask, _ in issues])):
+            result = results[lines.quote_index[i]]
+            for mask, message in issues:
+                if mask[i]:
+                    result['is_valid'] = False
+                    result['issues'].append(self._format(message, lines, i, list_totals, discounts, stock))
+
+    def _check_totals(self, lines: QuoteLines, results: List[Dict[str, Any]]) -> None:
+        # Quote totals must equal the sum of their pricing item prices to the cent
+        mismatched = np.isfinite(lines.totals) & (np.round(lines.item_sums, 2) != np.round(lines.totals, 2))
+        for i in np.flatnonzero(mismatched):
+            results[i]['is_valid'] = False
+            results[i]['issues'].append("Pricing calculations are incorrect")
+
+    @staticmethod
+    def _format(message: str, lines: QuoteLines, i: int, list_totals: Optional[np.ndarray],
+                discounts: Optional[np.ndarray], stock: Optional[np.ndarray]) -> str:
+        return message.format(
+            sku=lines.skus[i],
+            quantity=lines.quantities[i],
+            stock=stock[i] if stock is not None else np.nan,
+            price=lines.prices[i],
+            list_total=list_totals[i] if list_totals is not None else np.nan,
+            discount=discounts[i] if discounts is not None else np.nan
+        )
+
+def _price(item: Dict[str, Any]) -> float:
+    return _float(item.get('price'))
+
+def _float(value: Any) -> float:
+    return np.nan if value is None else float(value)
@@ -0,0 +1,45 @@
+import hashlib
+from typing import Any, Dict, Optional
+from src.ai.utils.lruCache import LRUCache
+from src.ai.utils.diskCache import DiskCache
+
+class ResponseCache:
+    """
+    Exact-match cache of generated responses keyed by the prompt and the model version
+
+    Lookups go to an in-memory LRU first and then to an optional disk tier shared
+    by all workers on the node. Only deterministic (greedy) generations may be cached.
+    """
+    def __init__(self, max_items: int = 10000, ttl_seconds: Optional[float] = 86400.0,
+                 path: Optional[str] = None):
+        self.memory = LRUCache(maxsize=max_items, ttl_seconds=ttl_seconds)
+        self.disk = DiskCache(path, ttl_seconds=ttl_seconds) if path else None
+
+    def get(self, prompt: str, model_version: str) -> Optional[str]:
+        """
+        Returns the cached response for a prompt, or None on a miss
+        """
+        key = self.key(prompt, model_version)
+        response = self.memory.get(key)
+        if response is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                response = data.decode('utf-8')
+                self.memory.set(key, response)
+        return response
+
+    def set(self, prompt: str, model_version: str, response: str) -> None:
+        """
+        Stores the response generated for a prompt in both tiers
+        """
+        key = self.key(prompt, model_version)
+        self.memory.set(key, response)
+        if self.disk is not None:
+            self.disk.set(key, response.encode('utf-8'))
+
+    def stats(self) -> Dict[str, Any]:
+        return self.memory.stats()
+
+    @staticmethod
+    def key(prompt: str, model_version: str) -> str:
+        return hashlib.sha256(f"{model_version}\0{prompt}".encode('utf-8')).hexdigest()
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import torch
+
+def to_legacy_past(past_key_values: Any) -> Any:
+    """
+    Converts a transformers cache object into the legacy tuple-of-tensors layout
+    """
+    if hasattr(past_key_values, 'to_legacy_cache'):
+        return past_key_values.to_legacy_cache()
+    return past_key_values
+
+def truncate_past(past_key_values: Any, length: int) -> Any:
+    """
+    Keeps the first `length` positions of every layer's key/value tensors
+    """
+    return tuple(
+        tuple(tensor[..., :length, :] for tensor in layer)
+        for layer in past_key_values
+    )
+
+def past_nbytes(past_key_values: Any) -> int:
+    """
+    Returns the memory used by a legacy key/value cache
+    """
+    return sum(
+        tensor.element_size() * tensor.nelement()
+        for layer in past_key_values
+        for tensor in layer
+        if isinstance(tensor, torch.Tensor)
+    )
+
+class SessionKVCache:
+    """
+    Per-session cache of the model's key/values for the last encoded prompt
+
+    Entries are evicted least-recently-used first when either the session count or
+    the memory cap is exceeded, and expire after ttl_seconds without access.
+    """
+    def __init__(self, max_sessions: int = 256, ttl_seconds: float = 1800.0, max_bytes: int = 2 * 1024 ** 3):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, session_id: str, token_ids: List[int]) -> Tuple[Optional[Any], int]:
+        """
+        Returns the cached key/values for the longest prefix shared with token_ids and its length
+
+        At least one token is always left uncached so the caller gets logits for the last position.
+        """
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None, 0
+            self._entries.move_to_end(session_id)
+            entry['last_access'] = time.monotonic()
+            cached_ids = entry['token_ids']
+            past_key_values = entry['past_key_values']
+
+            # Find the longest common prefix between the cached and the new prompt
+            limit = min(len(cached_ids), len(token_ids) - 1)
+            shared = 0
+            while shared < limit and cached_ids[shared] == token_ids[shared]:
+                shared += 1
+
+            if shared == 0:
+                self.misses += 1
+                return None, 0
+            self.hits += 1
+
+        if shared < len(cached_ids):
+            past_key_values = truncate_past(past_key_values, shared)
+        return past_key_values, shared
+
+    def put(self, session_id: str, token_ids: List[int], past_key_values: Any) -> None:
+        """
+        Stores the key/values covering token_ids for a session
+        """
+        past_key_values = to_legacy_past(past_key_values)
+        nbytes = past_nbytes(past_key_values)
+        if nbytes > self.max_bytes:
+            self.evict(session_id)
+            return
+
+        with self._lock:
+            previous = self._entries.pop(session_id, None)
+            if previous is not None:
+                self.total_bytes -= previous['nbytes']
+            self._entries[session_id] = {
+                'token_ids': list(token_ids),
+                'past_key_values': past_key_values,
+                'nbytes': nbytes,
+                'last_access': time.monotonic()
+            }
+            self.total_bytes += nbytes
+
+            # Evict least recently used sessions until both limits are respected
+            while self._entries and (len(self._entries) > self.max_sessions or self.total_bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= evicted['nbytes']
+
+    def evict(self, session_id: str) -> None:
+        """
+        Drops the cached key/values of a session, e.g. when the chat ends
+        """
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self.total_bytes -= entry['nbytes']
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns cache occupancy and hit/miss counters
+        """
+        with self._lock:
+            return {
+                'sessions': len(self._entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _expire(self) -> None:
+        # Entries are ordered by last access, so expired ones sit at the front
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if entry['last_access'] >= cutoff:
+                break
+            self._entries.popitem(last=False)
+            self.total_bytes -= entry['nbytes']
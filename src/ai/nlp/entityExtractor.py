@@ -1,19 +1,42 @@
-import spacy
-from typing import List, Dict, Any
-from src.ai.utils.text_preprocessor import preprocess_text
+from typing import TYPE_CHECKING, List, Dict, Any
+from src.ai.utils.text_preprocessor import preprocess_text, preprocess_texts
+from src.ai.nlp.keywordMatcher import KeywordMatcher
+from src.ai.utils.lazyModel import LazyModel
+from src.ai.utils.metrics import metrics
 from src.config import NER_MODEL_PATH, CUSTOM_ENTITIES
 
-# Global variable to store the loaded spaCy NER model
-nlp: spacy.language.Language = None
+# spaCy is imported when the model is loaded, not with this module
+if TYPE_CHECKING:
+    import spacy
 
-def load_ner_model() -> spacy.language.Language:
+# Pipeline components that produce entities
+ENTITY_PIPES = ("ner", "entity_ruler")
+
+# Global keyword automaton compiled from the keyword rules in CUSTOM_ENTITIES
+custom_entity_matcher: KeywordMatcher = None
+
+def load_ner_model() -> 'spacy.language.Language':
     """
-    Loads the Named Entity Recognition model
+    Loads the Named Entity Recognition model with only the components NER needs
     """
+    import spacy
+    
     # Load the pre-trained spaCy model using NER_MODEL_PATH
     model = spacy.load(NER_MODEL_PATH)
+
+    # Keep the entity components and any shared embedding layer the NER listens to
+    required = {name for name in model.pipe_names if name in ENTITY_PIPES}
+    for name in model.pipe_names:
+        if "ner" in getattr(model.get_pipe(name), "listening_components", []):
+            required.add(name)
+
+    # Remove everything else so unused components neither run nor stay in memory
+    for name in [name for name in model.pipe_names if name not in required]:
+        model.remove_pipe(name)
+
     return model
 
+@metrics.timed('extract_entities')
 def extract_entities(text: str) -> List[Dict[str, Any]]:
     """
     Extracts entities from the given text input
@@ -22,8 +45,30 @@ def extract_entities(text: str) -> List[Dict[str, Any]]:
     preprocessed_text = preprocess_text(text)
 
     # Apply the NER model to the preprocessed text
-    doc = nlp(preprocessed_text)
+    doc = ner_model.get()(preprocessed_text)
+
+    return collect_entities(doc, preprocessed_text)
+
+@metrics.timed('extract_entities_batch')
+def extract_entities_batch(texts: List[str], n_process: int = 1, batch_size: int = 256) -> List[List[Dict[str, Any]]]:
+    """
+    Extracts entities from many texts using spaCy's batched nlp.pipe
+    """
+    # Preprocess all texts, reusing cached results for repeated inputs
+    preprocessed_texts = preprocess_texts(texts)
+
+    # Stream the texts through the pipeline in batches, optionally across processes
+    docs = ner_model.get().pipe(preprocessed_texts, n_process=n_process, batch_size=batch_size)
 
+    return [
+        collect_entities(doc, preprocessed_text)
+        for preprocessed_text, doc in zip(preprocessed_texts, docs)
+    ]
+
+def collect_entities(doc: 'spacy.tokens.Doc', text: str) -> List[Dict[str, Any]]:
+    """
+    Combines the model's entities with custom rule-based entities for one text
+    """
     # Extract standard named entities
     standard_entities = [
         {"text": ent.text, "label": ent.label_, "start": ent.start_char, "end": ent.end_char}
@@ -31,7 +76,7 @@ def extract_entities(text: str) -> List[Dict[str, Any]]:
     ]
 
     # Apply custom entity extraction rules
-    custom_entities = extract_custom_entities(preprocessed_text)
+    custom_entities = extract_custom_entities(text)
 
     # Combine and format all extracted entities
     all_entities = standard_entities + custom_entities
@@ -41,15 +86,25 @@ def extract_entities(text: str) -> List[Dict[str, Any]]:
 
     return all_entities
 
+def build_custom_entity_matcher(custom_entities: Dict[str, Any]) -> KeywordMatcher:
+    """
+    Compiles the keyword rules of all custom entity types into one automaton
+    """
+    keywords = [
+        (keyword, entity_type)
+        for entity_type, entity_rules in custom_entities.items()
+        for keyword in entity_rules.get("keywords", [])
+    ]
+    return KeywordMatcher(keywords)
+
 def extract_custom_entities(text: str) -> List[Dict[str, Any]]:
     """
     Extracts custom entities based on predefined rules
     """
     custom_entities = []
 
-    # Iterate through CUSTOM_ENTITIES
+    # Apply the regex patterns of each custom entity type
     for entity_type, entity_rules in CUSTOM_ENTITIES.items():
-        # Apply regex patterns or keyword matching for each custom entity type
         if "regex" in entity_rules:
             matches = entity_rules["regex"].finditer(text)
             for match in matches:
@@ -59,21 +114,23 @@ def extract_custom_entities(text: str) -> List[Dict[str, Any]]:
                     "start": match.start(),
                     "end": match.end()
                 })
-        elif "keywords" in entity_rules:
-            for keyword in entity_rules["keywords"]:
-                start = text.lower().find(keyword.lower())
-                if start != -1:
-                    custom_entities.append({
-                        "text": text[start:start+len(keyword)],
-                        "label": entity_type,
-                        "start": start,
-                        "end": start + len(keyword)
-                    })
+
+    # Find every keyword occurrence of all entity types in a single pass
+    for match in custom_entity_matcher.find_all(text):
+        custom_entities.append({
+            "text": text[match["start"]:match["end"]],
+            "label": match["label"],
+            "start": match["start"],
+            "end": match["end"]
+        })
 
     return custom_entities
 
-# Initialize the NER model
-nlp = load_ner_model()
+# The NER model is loaded on first use, or up front through warmup()
+ner_model = LazyModel('ner', load_ner_model)
+
+# Compile the custom entity matcher
+custom_entity_matcher = build_custom_entity_matcher(CUSTOM_ENTITIES)
 
 # Export the main function for entity extraction
-__all__ = ["extract_entities"]
\ No newline at end of file
+__all__ = ["extract_entities", "extract_entities_batch"]
\ No newline at end of file
@@ -1,13 +1,22 @@
-import tensorflow as tf
 import numpy as np
+from typing import Dict, List
 from sklearn.preprocessing import LabelEncoder
-from src.ai.utils.text_preprocessor import preprocess_text
+from src.ai.utils.text_preprocessor import preprocess_text, preprocess_texts
 from src.ai.utils.model_loader import load_model
-from src.config import INTENT_MODEL_PATH, INTENT_CLASSES
+from src.ai.utils.lruCache import LRUCache
+from src.ai.utils.batchScheduler import MicroBatchScheduler
+from src.ai.utils.lazyModel import LazyModel
+from src.ai.utils.metrics import metrics
+from src.config import INTENT_MODEL_PATH, INTENT_CLASSES, INTENT_CONFIG
 
-# Global variables
-model: tf.keras.Model = None
-label_encoder: LabelEncoder = None
+# Cache and batching settings
+INTENT_CACHE_SIZE = INTENT_CONFIG.get('cache_size', 10000)
+INTENT_MAX_BATCH_SIZE = INTENT_CONFIG.get('max_batch_size', 64)
+INTENT_MAX_BATCH_WAIT_MS = INTENT_CONFIG.get('max_batch_wait_ms', 2.0)
+
+# Cache of preprocessed text -> (intent, probability) for repeated messages
+intent_cache = LRUCache(maxsize=INTENT_CACHE_SIZE)
+metrics.register_cache('intent', intent_cache.stats)
 
 def load_intent_classifier() -> tuple:
     """
@@ -16,8 +25,6 @@ def load_intent_classifier() -> tuple:
     Returns:
         tuple: (tf.keras.Model, LabelEncoder)
     """
-    global model, label_encoder
-    
     # Load the pre-trained model using load_model function
     model = load_model(INTENT_MODEL_PATH)
     
@@ -28,6 +35,7 @@ def load_intent_classifier() -> tuple:
     # Return the loaded model and label encoder
     return model, label_encoder
 
+@metrics.timed('classify_intent')
 def classify_intent(text: str) -> tuple:
     """
     Classifies the intent of a given text input
@@ -41,24 +49,83 @@ def classify_intent(text: str) -> tuple:
     # Preprocess the input text using preprocess_text function
     preprocessed_text = preprocess_text(text)
     
-    # Convert preprocessed text to model input format
-    # Note: Assuming the model expects a 1D array of tokenized text
-    model_input = np.array([preprocessed_text])
+    # Return the cached prediction for repeated messages
+    cached = intent_cache.get(preprocessed_text)
+    if cached is not None:
+        return cached
+    
+    # Classify through the micro-batcher so concurrent requests share one forward call
+    result = intent_batcher(preprocessed_text)
+    intent_cache.set(preprocessed_text, result)
+    
+    return result
+
+def classify_intents(texts: List[str]) -> List[tuple]:
+    """
+    Classifies the intents of many text inputs with a single forward call
+    
+    Args:
+        texts (List[str]): Input texts to classify
+    
+    Returns:
+        List[tuple]: (string, float) - Predicted intent label and probability per input
+    """
+    preprocessed = preprocess_texts(texts)
+    results: List[tuple] = [None] * len(texts)
+    
+    # Serve repeated messages from the cache and group the rest by distinct text
+    pending: Dict[str, List[int]] = {}
+    for i, preprocessed_text in enumerate(preprocessed):
+        cached = intent_cache.get(preprocessed_text)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.setdefault(preprocessed_text, []).append(i)
+    
+    # Predict all uncached texts in one batch
+    if pending:
+        unique_texts = list(pending)
+        for preprocessed_text, result in zip(unique_texts, predict_intents(unique_texts)):
+            intent_cache.set(preprocessed_text, result)
+            for i in pending[preprocessed_text]:
+                results[i] = result
+    
+    return results
+
+def predict_intents(preprocessed_texts: List[str]) -> List[tuple]:
+    """
+    Runs the intent model on a batch of already preprocessed texts
     
-    # Use the model to predict intent probabilities
-    intent_probabilities = model.predict(model_input)[0]
+    Args:
+        preprocessed_texts (List[str]): Preprocessed input texts
     
-    # Get the index of the highest probability
-    predicted_index = np.argmax(intent_probabilities)
+    Returns:
+        List[tuple]: (string, float) - Predicted intent label and probability per input
+    """
+    # Convert preprocessed texts to model input format and predict in one call
+    model, label_encoder = intent_model.get()
+    model_input = np.array(preprocessed_texts)
+    intent_probabilities = np.asarray(model.predict_on_batch(model_input))
     
-    # Use label_encoder to convert index to intent label
-    predicted_intent = label_encoder.inverse_transform([predicted_index])[0]
+    # Get the index and probability of the most likely intent for every row
+    predicted_indices = np.argmax(intent_probabilities, axis=1)
+    predicted_probabilities = intent_probabilities[np.arange(len(predicted_indices)), predicted_indices]
     
-    # Get the probability of the predicted intent
-    predicted_probability = intent_probabilities[predicted_index]
+    # Use label_encoder to convert indices to intent labels
+    predicted_intents = label_encoder.inverse_transform(predicted_indices)
     
-    # Return the predicted intent label and its probability
-    return predicted_intent, float(predicted_probability)
+    return [
+        (intent, float(probability))
+        for intent, probability in zip(predicted_intents, predicted_probabilities)
+    ]
+
+# Micro-batcher for the online path
+intent_batcher = MicroBatchScheduler(
+    predict_intents,
+    max_batch_size=INTENT_MAX_BATCH_SIZE,
+    max_wait_ms=INTENT_MAX_BATCH_WAIT_MS,
+    name='intent-batch-scheduler'
+)
 
-# Initialize model and label_encoder
-model, label_encoder = load_intent_classifier()
\ No newline at end of file
+# Model and label_encoder are loaded on first use, or up front through warmup()
+intent_model = LazyModel('intent', load_intent_classifier)
\ No newline at end of file
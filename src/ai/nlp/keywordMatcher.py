@@ -0,0 +1,92 @@
+from collections import deque
+from typing import Any, Dict, Iterable, List, Tuple
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton that finds every occurrence of many keywords in one linear pass
+    """
+    def __init__(self, keywords: Iterable[Tuple[str, Any]], case_sensitive: bool = False, word_boundaries: bool = True):
+        """
+        Builds the automaton from (keyword, label) pairs
+        """
+        self.case_sensitive = case_sensitive
+        self.word_boundaries = word_boundaries
+        # Trie transitions, failure links and (keyword length, label) outputs per state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, Any]]] = [[]]
+
+        for keyword, label in keywords:
+            if keyword:
+                self._add(self._normalize(keyword), label)
+        self._build_failure_links()
+
+    def find_all(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Returns every keyword occurrence as {"start", "end", "label"}, ordered by end position
+        """
+        normalized = self._normalize(text)
+        matches = []
+        state = 0
+        for position, char in enumerate(normalized):
+            # Follow failure links until a transition on this character exists
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+
+            for length, label in self._outputs[state]:
+                start = position - length + 1
+                end = position + 1
+                if self.word_boundaries and not self._on_word_boundaries(normalized, start, end):
+                    continue
+                matches.append({"start": start, "end": end, "label": label})
+
+        return matches
+
+    def _normalize(self, text: str) -> str:
+        if self.case_sensitive:
+            return text
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return lowered
+        # A few characters expand when lowercased; keep those as-is so offsets stay aligned
+        return "".join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+    def _add(self, keyword: str, label: Any) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append((len(keyword), label))
+
+    def _build_failure_links(self) -> None:
+        # Breadth-first traversal so every state's failure target is already resolved
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    @staticmethod
+    def _on_word_boundaries(text: str, start: int, end: int) -> bool:
+        # Like regex \b: only enforce a boundary where the keyword itself starts or ends with a word character
+        if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
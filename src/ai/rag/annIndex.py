@@ -0,0 +1,302 @@
+import heapq
+import math
+import os
+import pickle
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from src.ai.rag.embeddingStore import EmbeddingStore, current_version, publish_version
+
+class HNSWIndex:
+    """
+    Hierarchical Navigable Small World graph for approximate cosine-similarity search
+
+    Vectors are L2-normalized on insert so that similarity is a dot product. Deletes
+    are tombstones: deleted nodes still route searches but never appear in results,
+    and compact() rebuilds the graph without them.
+    """
+    def __init__(self, dim: int, M: int = 16, ef_construction: int = 200, ef_search: int = 64, seed: int = 42):
+        self.dim = dim
+        self.M = M
+        self.max_neighbors_level0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.level_multiplier = 1.0 / math.log(M)
+        self._rng = np.random.default_rng(seed)
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._count = 0
+        self._ids: List[Hashable] = []
+        self._labels: Dict[Hashable, int] = {}
+        self._levels: List[int] = []
+        self._graph: List[List[List[int]]] = []
+        self._deleted: set = set()
+        self._entry_point: Optional[int] = None
+        self._max_level = -1
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._labels
+
+    def add(self, doc_ids: Sequence[Hashable], vectors: np.ndarray) -> None:
+        """
+        Inserts vectors under the given ids; an existing id is replaced
+        """
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        if len(doc_ids) != len(vectors):
+            raise ValueError("doc_ids and vectors must have the same length")
+        for doc_id, vector in zip(doc_ids, vectors):
+            if doc_id in self._labels:
+                self.delete([doc_id])
+            self._insert(doc_id, vector)
+
+    def delete(self, doc_ids: Iterable[Hashable]) -> None:
+        """
+        Removes ids from the index; unknown ids are ignored
+        """
+        for doc_id in doc_ids:
+            node = self._labels.pop(doc_id, None)
+            if node is not None:
+                self._deleted.add(node)
+
+    def search(self, query: np.ndarray, k: int, ef: Optional[int] = None) -> List[Tuple[Hashable, float]]:
+        """
+        Returns up to k (id, cosine similarity) pairs; a larger ef raises recall and latency
+        """
+        if self._entry_point is None or not self._labels:
+            return []
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(1, self.dim))[0]
+        ef = max(ef or self.ef_search, k)
+
+        # Greedy descent through the upper layers, then a wide search on the bottom layer
+        entry = self._entry_point
+        for level in range(self._max_level, 0, -1):
+            entry = self._search_layer(query, [entry], 1, level)[0][1]
+        candidates = self._search_layer(query, [entry], ef + min(len(self._deleted), ef), 0)
+
+        results = []
+        for distance, node in candidates:
+            if node in self._deleted:
+                continue
+            results.append((self._ids[node], 1.0 - distance))
+            if len(results) == k:
+                break
+        return results
+
+    def exact_search(self, query: np.ndarray, k: int) -> List[Tuple[Hashable, float]]:
+        """
+        Brute-force search over all live vectors, used as the recall baseline
+        """
+        if not self._labels:
+            return []
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(1, self.dim))[0]
+        nodes = np.fromiter(self._labels.values(), dtype=np.int64)
+        similarities = self._vectors[nodes] @ query
+        k = min(k, len(nodes))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(self._ids[nodes[i]], float(similarities[i])) for i in top]
+
+    def compact(self) -> "HNSWIndex":
+        """
+        Returns a new index containing only the live vectors
+        """
+        index = HNSWIndex(self.dim, self.M, self.ef_construction, self.ef_search)
+        doc_ids = list(self._labels)
+        if doc_ids:
+            index.add(doc_ids, self._vectors[[self._labels[doc_id] for doc_id in doc_ids]])
+        return index
+
+    def save(self, path: str, dtype: str = 'float32') -> None:
+        """
+        Persists the graph and vectors so the index can be reloaded without a rebuild
+
+        The graph and an EmbeddingStore of the vectors and ids are written to a new
+        version directory, which is then published at path in one atomic step, so a
+        reader or a crash never pairs a graph with vectors of another version.
+        """
+        state = {
+            'dim': self.dim,
+            'M': self.M,
+            'ef_construction': self.ef_construction,
+            'ef_search': self.ef_search,
+            'levels': self._levels,
+            'graph': self._graph,
+            'deleted': self._deleted,
+            'entry_point': self._entry_point,
+            'max_level': self._max_level
+        }
+
+        def write_files(directory: str) -> None:
+            EmbeddingStore.write_files(directory, self._ids, self._vectors[:self._count], dtype=dtype)
+            graph_path = os.path.join(directory, 'graph.pkl')
+            with open(graph_path + '.tmp', 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(graph_path + '.tmp', graph_path)
+
+        publish_version(path, write_files)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        """
+        Returns whether an index has been published at path
+        """
+        return current_version(path) is not None
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "HNSWIndex":
+        """
+        Loads the index most recently published at path by save()
+
+        With mmap, the vectors stay memory-mapped and are shared between processes;
+        the first insert copies them into process memory.
+        """
+        directory = current_version(path)
+        if directory is None:
+            raise FileNotFoundError(f"No index published at {path}")
+        with open(os.path.join(directory, 'graph.pkl'), 'rb') as f:
+            state = pickle.load(f)
+        store = EmbeddingStore(directory)
+        index = cls(state['dim'], state['M'], state['ef_construction'], state['ef_search'])
+        index._vectors = store.vectors if mmap else np.array(store.vectors, dtype=np.float32)
+        index._count = len(store)
+        index._ids = store.id_list()
+        index._levels = state['levels']
+        index._graph = state['graph']
+        index._deleted = state['deleted']
+        index._entry_point = state['entry_point']
+        index._max_level = state['max_level']
+        index._labels = {
+            doc_id: node for node, doc_id in enumerate(index._ids) if node not in index._deleted
+        }
+        return index
+
+    def _insert(self, doc_id: Hashable, vector: np.ndarray) -> None:
+        node = self._append_vector(vector)
+        level = int(-math.log(1.0 - self._rng.random()) * self.level_multiplier)
+        self._ids.append(doc_id)
+        self._labels[doc_id] = node
+        self._levels.append(level)
+        self._graph.append([[] for _ in range(level + 1)])
+
+        if self._entry_point is None:
+            self._entry_point = node
+            self._max_level = level
+            return
+
+        # Descend greedily to the node's top level
+        entry = self._entry_point
+        for layer in range(self._max_level, level, -1):
+            entry = self._search_layer(vector, [entry], 1, layer)[0][1]
+
+        # Connect the node on every layer it belongs to
+        entry_points = [entry]
+        for layer in range(min(level, self._max_level), -1, -1):
+            candidates = self._search_layer(vector, entry_points, self.ef_construction, layer)
+            neighbors = [candidate for _, candidate in candidates[:self.M]]
+            self._graph[node][layer] = neighbors
+            max_neighbors = self.max_neighbors_level0 if layer == 0 else self.M
+            for neighbor in neighbors:
+                links = self._graph[neighbor][layer]
+                links.append(node)
+                if len(links) > max_neighbors:
+                    self._graph[neighbor][layer] = self._closest(self._vectors[neighbor], links, max_neighbors)
+            entry_points = [candidate for _, candidate in candidates]
+
+        if level > self._max_level:
+            self._entry_point = node
+            self._max_level = level
+
+    def _append_vector(self, vector: np.ndarray) -> int:
+        # Grow the vector matrix geometrically to keep inserts amortized O(1)
+        if self._count == len(self._vectors):
+            capacity = max(1024, 2 * len(self._vectors))
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self._count] = self._vectors[:self._count]
+            self._vectors = grown
+        self._vectors[self._count] = vector
+        self._count += 1
+        return self._count - 1
+
+    def _search_layer(self, query: np.ndarray, entry_points: List[int], ef: int, level: int) -> List[Tuple[float, int]]:
+        # Best-first search returning up to ef (distance, node) pairs sorted by distance
+        visited = set(entry_points)
+        distances = 1.0 - self._vectors[entry_points] @ query
+        candidates = list(zip(distances.tolist(), entry_points))
+        heapq.heapify(candidates)
+        results = [(-distance, node) for distance, node in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if distance > -results[0][0]:
+                break
+            neighbors = [n for n in self._graph[node][level] if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            neighbor_distances = 1.0 - self._vectors[neighbors] @ query
+            for neighbor_distance, neighbor in zip(neighbor_distances.tolist(), neighbors):
+                if len(results) < ef or neighbor_distance < -results[0][0]:
+                    heapq.heappush(candidates, (neighbor_distance, neighbor))
+                    heapq.heappush(results, (-neighbor_distance, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted((-negative_distance, node) for negative_distance, node in results)
+
+    def _closest(self, vector: np.ndarray, nodes: List[int], count: int) -> List[int]:
+        similarities = self._vectors[nodes] @ vector
+        order = np.argsort(-similarities)[:count]
+        return [nodes[i] for i in order]
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def benchmark_recall(index: HNSWIndex, queries: np.ndarray, k: int = 10,
+                     ef_values: Sequence[int] = (16, 32, 64, 128, 256)) -> List[Dict[str, Any]]:
+    """
+    Measures recall@k and per-query latency of the index against exact search
+
+    Args:
+        index (HNSWIndex): Populated index to benchmark
+        queries (np.ndarray): Query vectors, one per row
+        k (int): Number of neighbours to retrieve
+        ef_values (Sequence[int]): Search breadths to compare
+
+    Returns:
+        List[Dict[str, Any]]: One row per ef with recall and latency statistics
+    """
+    # Compute the exact neighbours once as ground truth
+    exact_latencies = []
+    ground_truth = []
+    for query in queries:
+        started = time.perf_counter()
+        ground_truth.append({doc_id for doc_id, _ in index.exact_search(query, k)})
+        exact_latencies.append(time.perf_counter() - started)
+
+    rows = []
+    for ef in ef_values:
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, ground_truth):
+            started = time.perf_counter()
+            found = index.search(query, k, ef=ef)
+            latencies.append(time.perf_counter() - started)
+            hits += len(expected & {doc_id for doc_id, _ in found})
+        latencies_ms = np.array(latencies) * 1000.0
+        rows.append({
+            'ef': ef,
+            'recall_at_k': hits / max(sum(len(expected) for expected in ground_truth), 1),
+            'mean_latency_ms': float(latencies_ms.mean()),
+            'p95_latency_ms': float(np.percentile(latencies_ms, 95)),
+            'exact_mean_latency_ms': float(np.mean(exact_latencies) * 1000.0)
+        })
+    return rows
@@ -1,67 +1,111 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 import numpy as np
 from src.ai.utils.text_preprocessor import preprocess_text
 from src.ai.nlp.entityExtractor import extract_entities
-from src.config import SYNTHESIS_CONFIG
+from src.ai.rag.passageIndex import get_passage_index, bm25_scores
+from src.ai.rag.documentRetriever import embed_texts
+from src.ai.utils.lazyModel import LazyModel
+from src.ai.utils.metrics import metrics
+from src.config import SYNTHESIS_CONFIG, MODEL_CONFIG
 
-def synthesize_context(documents: List[Dict[str, Any]], query: str) -> str:
+def load_chat_tokenizer():
+    """
+    Loads the chat model tokenizer; transformers is imported here rather than with this module
+    """
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(MODEL_CONFIG['model_name'])
+
+# Chat model tokenizer used to measure the context budget, loaded on first use
+chat_tokenizer = LazyModel('chat-tokenizer', load_chat_tokenizer)
+
+@metrics.timed('synthesize_context')
+def synthesize_context(documents: List[Dict[str, Any]], query: str,
+                       count_tokens: Optional[Callable[[List[str]], List[int]]] = None,
+                       entities: Optional[List[Dict[str, Any]]] = None,
+                       embed: Optional[Callable[[List[str]], np.ndarray]] = None) -> str:
     # Preprocess the query
     preprocessed_query = preprocess_text(query)
     
-    # Extract entities from the query
-    entities = extract_entities(preprocessed_query)
-    
-    # Sort documents by relevance score
-    sorted_documents = sorted(documents, key=lambda x: x.get('relevance_score', 0), reverse=True)
+    # Extract entities from the query unless the caller already has them
+    if entities is None:
+        entities = extract_entities(preprocessed_query)
     
-    # Initialize an empty context string
-    context = ""
-    remaining_length = SYNTHESIS_CONFIG['max_context_length']
+    # Rank passages across all documents with the hybrid dense + BM25 score
+    ranked_passages = rank_passages(documents, preprocessed_query, entities, embed or embed_texts)
     
-    # Extract and add relevant passages to the context
-    for doc in sorted_documents:
-        if remaining_length <= 0:
-            break
-        
-        relevant_passages = extract_relevant_passages(doc, preprocessed_query, entities)
-        
-        for passage in relevant_passages:
-            if len(passage) <= remaining_length:
-                context += passage + " "
-                remaining_length -= len(passage)
-            else:
-                break
+    # Pack whole passages into the token budget of the chat model's prompt
+    selected_passages = pack_passages(ranked_passages, SYNTHESIS_CONFIG.get('max_context_tokens', 512),
+                                      count_tokens or count_chat_tokens)
     
     # Reorder and structure the context for coherence
-    structured_context = reorder_context(context.split())
+    structured_context = reorder_context(selected_passages)
     
     return structured_context
 
-def extract_relevant_passages(document: Dict[str, Any], query: str, entities: List[Dict[str, Any]]) -> List[str]:
-    # Split the document into sentences or paragraphs
-    passages = document['content'].split('\n')
+def rank_passages(documents: List[Dict[str, Any]], query: str, entities: List[Dict[str, Any]],
+                  embed: Callable[[List[str]], np.ndarray]) -> List[str]:
+    # Gather every document's precomputed passage index
+    passage_indexes = [get_passage_index(doc) for doc in documents]
+    passages = [passage for index in passage_indexes for passage in index.passages]
+    if not passages:
+        return []
     
-    # Calculate relevance scores for each passage
-    scores = []
-    for passage in passages:
-        query_overlap = len(set(query.split()) & set(passage.split()))
-        entity_overlap = sum(1 for entity in entities if entity['text'].lower() in passage.lower())
-        score = query_overlap + entity_overlap
-        scores.append(score)
+    # Dense signal: cosine similarity of the query and each passage, embedded like the retrieved documents
+    vectors = embed([query] + [passage for index in passage_indexes for passage in index.preprocessed])
+    dense = vectors[1:] @ vectors[0]
+    
+    # Lexical signal: BM25 of the preprocessed query terms over all candidate passages
+    terms = list(dict.fromkeys(query.split()))
+    term_frequencies = np.vstack([index.term_frequencies(terms) for index in passage_indexes])
+    lengths = np.concatenate([index.lengths for index in passage_indexes])
+    lexical = bm25_scores(term_frequencies, lengths)
     
-    # Convert scores to numpy array for easier manipulation
-    scores_array = np.array(scores)
+    # Entity signal: number of query entities mentioned by each passage
+    entity = np.concatenate([index.entity_overlap(entities) for index in passage_indexes])
     
-    # Sort passages by relevance score
-    sorted_indices = np.argsort(scores_array)[::-1]
+    # Fuse the normalized signals and keep the best candidates in ranked order
+    scores = (SYNTHESIS_CONFIG.get('dense_weight', 0.5) * _min_max(dense)
+              + SYNTHESIS_CONFIG.get('bm25_weight', 0.5) * _min_max(lexical)
+              + SYNTHESIS_CONFIG.get('entity_weight', 0.2) * _min_max(entity))
+    limit = min(SYNTHESIS_CONFIG.get('max_candidate_passages', 200), len(scores))
+    candidates = np.argpartition(-scores, limit - 1)[:limit]
+    candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
     
-    # Select top N passages based on relevance and diversity
+    # Drop empty lines and passages repeated across documents
+    ranked_passages = []
+    seen = set()
+    for i in candidates:
+        passage = passages[i].strip()
+        if passage and passage not in seen:
+            seen.add(passage)
+            ranked_passages.append(passage)
+    
+    return ranked_passages
+
+def pack_passages(passages: List[str], max_tokens: int, count_tokens: Callable[[List[str]], List[int]]) -> List[str]:
+    # Greedily take whole passages in rank order while they fit the token budget
     selected_passages = []
-    for idx in sorted_indices[:SYNTHESIS_CONFIG['max_passages']]:
-        selected_passages.append(passages[idx])
+    remaining_tokens = max_tokens
+    for passage, tokens in zip(passages, count_tokens(passages) if passages else []):
+        # Count one extra token for the separator between passages
+        if tokens + 1 <= remaining_tokens:
+            selected_passages.append(passage)
+            remaining_tokens -= tokens + 1
+        if remaining_tokens <= 1:
+            break
     
     return selected_passages
 
+def count_chat_tokens(texts: List[str]) -> List[int]:
+    # Count tokens with the chat model's tokenizer
+    return [len(ids) for ids in chat_tokenizer.get()(texts, add_special_tokens=False)['input_ids']]
+
+def _min_max(values: np.ndarray) -> np.ndarray:
+    spread = values.max() - values.min()
+    if spread <= 0:
+        return np.zeros_like(values)
+    return (values - values.min()) / spread
+
 def reorder_context(passages: List[str]) -> str:
     # Group passages by topic or entity (simplified version)
     grouped_passages = {}
@@ -76,14 +120,13 @@ def reorder_context(passages: List[str]) -> str:
     # Order groups by relevance (assuming more passages in a group means higher relevance)
     ordered_groups = sorted(grouped_passages.values(), key=len, reverse=True)
     
-    # Combine passages into a single coherent text with transitional phrases
-    structured_context = ""
+    # Combine passages into a single coherent text with transitional phrases, keeping passage boundaries
+    sections = []
     for i, group in enumerate(ordered_groups):
-        if i > 0:
-            structured_context += "Furthermore, "
-        structured_context += " ".join(group) + " "
+        section = "\n".join(group)
+        sections.append("Furthermore, " + section if i > 0 else section)
     
-    return structured_context.strip()
+    return "\n".join(sections).strip()
 
 # Export the main function
 __all__ = ['synthesize_context']
\ No newline at end of file
@@ -1,33 +1,33 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 from src.ai.rag.vectorStore import VectorStore
 from src.ai.rag.knowledgeBase import KnowledgeBase
 from src.ai.utils.text_preprocessor import preprocess_text
+from src.ai.utils.lazyModel import LazyModel
+from src.ai.utils.metrics import metrics
 from src.config import RETRIEVAL_CONFIG
 
-# Global variables
-vector_store: VectorStore = None
-knowledge_base: KnowledgeBase = None
-
-def initialize_retriever() -> None:
+def initialize_retriever() -> Tuple[VectorStore, KnowledgeBase]:
     """
     Initializes the document retriever with necessary components
     """
-    global vector_store, knowledge_base
-
     # Initialize VectorStore with configuration settings
     vector_store = VectorStore(**RETRIEVAL_CONFIG.get('vector_store', {}))
 
     # Initialize KnowledgeBase with configuration settings
     knowledge_base = KnowledgeBase(**RETRIEVAL_CONFIG.get('knowledge_base', {}))
 
-def retrieve_documents(query: str, top_k: int) -> List[Dict[str, Any]]:
+    return vector_store, knowledge_base
+
+@metrics.timed('retrieve_documents')
+def retrieve_documents(query: str, top_k: int, ef: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Retrieves relevant documents based on the given query
 
     Args:
         query (str): The input query
         top_k (int): Number of top documents to retrieve
+        ef (Optional[int]): Search breadth of the ANN index; higher trades latency for recall
 
     Returns:
         List[Dict[str, Any]]: List of retrieved documents with metadata
@@ -36,15 +36,17 @@ def retrieve_documents(query: str, top_k: int) -> List[Dict[str, Any]]:
     preprocessed_query = preprocess_text(query)
 
     # Convert preprocessed query to vector representation
+    vector_store, knowledge_base = retriever.get()
     query_vector = vector_store.text_to_vector(preprocessed_query)
 
     # Perform similarity search using vector_store to get top_k similar document IDs
-    similar_docs = vector_store.similarity_search(query_vector, top_k)
+    similar_docs = vector_store.similarity_search(query_vector, top_k, ef=ef)
 
-    # Retrieve full documents from knowledge_base using the document IDs
+    # Retrieve full documents from knowledge_base in one bulk lookup, keeping similarity order
+    documents = knowledge_base.get_documents([doc_id for doc_id, _ in similar_docs])
     retrieved_documents = []
     for doc_id, similarity_score in similar_docs:
-        document = knowledge_base.get_document(doc_id)
+        document = documents.get(doc_id)
         if document:
             document['similarity_score'] = similarity_score
             retrieved_documents.append(document)
@@ -52,6 +54,15 @@ def retrieve_documents(query: str, top_k: int) -> List[Dict[str, Any]]:
     # Return list of retrieved documents with their metadata and similarity scores
     return retrieved_documents
 
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Encodes preprocessed texts with the retriever's encoder, one normalized row per text
+
+    Embeddings are served from the vector store's caches when the texts were encoded before.
+    """
+    vector_store, _ = retriever.get()
+    return vector_store.text_to_vectors(texts)
+
 def filter_documents(documents: List[Dict[str, Any]], similarity_threshold: float) -> List[Dict[str, Any]]:
     """
     Filters retrieved documents based on relevance and other criteria
@@ -76,5 +87,5 @@ def filter_documents(documents: List[Dict[str, Any]], similarity_threshold: floa
     # Return the filtered and sorted list of documents
     return sorted_docs
 
-# Initialize the document retriever components
-initialize_retriever()
\ No newline at end of file
+# The document retriever components are initialized on first use, or up front through warmup()
+retriever = LazyModel('retriever', initialize_retriever)
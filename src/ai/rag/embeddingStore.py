@@ -0,0 +1,191 @@
+import json
+import os
+import re
+import shutil
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+# Version of the on-disk layout, bumped on incompatible changes
+FORMAT_VERSION = 2
+SUPPORTED_DTYPES = ('float32', 'float16')
+
+# File, next to the store path, naming the version directory readers should open
+POINTER_SUFFIX = '.current'
+
+class EmbeddingStore:
+    """
+    Read-only embedding matrix memory-mapped from disk
+
+    A store is a version directory holding:
+      - vectors.bin: the embeddings as one contiguous row-major float32/float16 matrix
+      - ids.npy: the id of every row, in row order, as int64 or fixed-width strings
+      - id_is_int.npy: which string ids were ints, only when ints and strings are mixed
+      - meta.json: format version, dtype, row count, dimension and id kind
+
+    Versions are published with publish_version(): everything is written to a new
+    directory and one atomic pointer update makes it current, so readers never mix
+    files of different versions. Opening a store maps the files instead of reading
+    them, so worker processes share the pages through the OS cache and start
+    without loading any vectors.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported embedding store version: {meta.get('version')}")
+
+        self.dtype = meta['dtype']
+        self.dim = meta['dim']
+        self.id_kind = meta['id_kind']
+        count = meta['count']
+        if count:
+            self.vectors = np.memmap(os.path.join(directory, 'vectors.bin'), dtype=self.dtype, mode='r',
+                                     shape=(count, self.dim))
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype=self.dtype)
+        self.ids = np.load(os.path.join(directory, 'ids.npy'), mmap_mode='r', allow_pickle=False)
+        self._id_is_int = (np.load(os.path.join(directory, 'id_is_int.npy'), allow_pickle=False)
+                           if self.id_kind == 'mixed' else None)
+        self._positions: Optional[Dict[Any, int]] = None
+
+    @classmethod
+    def open(cls, path: str) -> 'EmbeddingStore':
+        """
+        Opens the version currently published at path
+        """
+        directory = current_version(path)
+        if directory is None:
+            raise FileNotFoundError(f"No embedding store published at {path}")
+        return cls(directory)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def id_list(self) -> List[Any]:
+        """
+        Returns the ids in row order with their original int or str types
+        """
+        ids = self.ids.tolist()
+        if self._id_is_int is not None:
+            return [int(doc_id) if is_int else doc_id for doc_id, is_int in zip(ids, self._id_is_int.tolist())]
+        return ids
+
+    def position(self, doc_id: Any) -> Optional[int]:
+        """
+        Returns the row of an id, building the id lookup on first use
+        """
+        if self._positions is None:
+            self._positions = {doc_id: row for row, doc_id in enumerate(self.id_list())}
+        return self._positions.get(doc_id)
+
+    def get(self, doc_ids: Sequence[Any]) -> np.ndarray:
+        """
+        Returns the embeddings of the given ids as float32 rows
+        """
+        rows = [self.position(doc_id) for doc_id in doc_ids]
+        if any(row is None for row in rows):
+            raise KeyError("Unknown embedding id")
+        return np.asarray(self.vectors[rows], dtype=np.float32)
+
+    @staticmethod
+    def write(path: str, doc_ids: Sequence[Any], vectors: np.ndarray, dtype: str = 'float32') -> str:
+        """
+        Writes a new version of the store at path and publishes it; returns its directory
+        """
+        return publish_version(path, lambda directory: EmbeddingStore.write_files(directory, doc_ids, vectors, dtype))
+
+    @staticmethod
+    def write_files(directory: str, doc_ids: Sequence[Any], vectors: np.ndarray, dtype: str = 'float32') -> None:
+        """
+        Writes the store files into an unpublished version directory
+
+        Ids must be ints or strings; a mix of both keeps each id's type.
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"dtype must be one of {SUPPORTED_DTYPES}")
+        vectors = np.ascontiguousarray(vectors, dtype=dtype)
+        if vectors.ndim != 2 or len(vectors) != len(doc_ids):
+            raise ValueError("vectors must be a 2-D matrix with one row per id")
+        ids, id_is_int, id_kind = _encode_ids(doc_ids)
+
+        with open(os.path.join(directory, 'vectors.bin'), 'wb') as f:
+            vectors.tofile(f)
+            _sync(f)
+        with open(os.path.join(directory, 'ids.npy'), 'wb') as f:
+            np.save(f, ids, allow_pickle=False)
+            _sync(f)
+        if id_kind == 'mixed':
+            with open(os.path.join(directory, 'id_is_int.npy'), 'wb') as f:
+                np.save(f, id_is_int, allow_pickle=False)
+                _sync(f)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'version': FORMAT_VERSION, 'dtype': dtype, 'count': len(vectors), 'dim': vectors.shape[1],
+                       'id_kind': id_kind}, f)
+            _sync(f)
+
+def current_version(path: str) -> Optional[str]:
+    """
+    Returns the version directory published at path, or None when nothing was published yet
+    """
+    try:
+        with open(path + POINTER_SUFFIX) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(path)), name)
+
+def publish_version(path: str, write_files: Callable[[str], None]) -> str:
+    """
+    Writes a new version directory next to path and atomically makes it the current one
+
+    write_files fills the directory. The pointer file is replaced only after every
+    file is on disk, so a crash leaves the previous version current. The previous
+    version is kept for readers that resolved the pointer just before the swap;
+    older versions and directories left behind by failed writes are removed.
+    """
+    parent, base = os.path.split(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    pattern = re.compile(re.escape(base) + r"\.v(\d+)$")
+    versions = {name: int(match.group(1)) for name in os.listdir(parent) for match in [pattern.match(name)] if match}
+
+    name = f"{base}.v{max(versions.values(), default=0) + 1}"
+    directory = os.path.join(parent, name)
+    os.makedirs(directory)
+    try:
+        write_files(directory)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    # Publish with a single rename of the pointer file
+    previous = current_version(path)
+    temporary_path = path + POINTER_SUFFIX + '.tmp'
+    with open(temporary_path, 'w') as f:
+        f.write(name)
+        _sync(f)
+    os.replace(temporary_path, path + POINTER_SUFFIX)
+
+    kept = {name, os.path.basename(previous) if previous else None}
+    for old_name in versions:
+        if old_name not in kept:
+            shutil.rmtree(os.path.join(parent, old_name), ignore_errors=True)
+    return directory
+
+def _encode_ids(doc_ids: Sequence[Any]) -> tuple:
+    # Ints are stored as int64; strings, and ints mixed with strings, as fixed-width unicode
+    is_int = np.array([isinstance(doc_id, (int, np.integer)) and not isinstance(doc_id, bool) for doc_id in doc_ids],
+                      dtype=bool)
+    for doc_id, flag in zip(doc_ids, is_int):
+        if not flag and not isinstance(doc_id, str):
+            raise TypeError(f"Embedding ids must be int or str, got {type(doc_id).__name__}")
+    if len(doc_ids) and is_int.all():
+        return np.array(doc_ids, dtype=np.int64), None, 'int'
+    ids = np.array([str(doc_id) for doc_id in doc_ids], dtype=str)
+    if is_int.any():
+        return ids, is_int, 'mixed'
+    return ids, None, 'str'
+
+def _sync(f) -> None:
+    f.flush()
+    os.fsync(f.fileno())
@@ -0,0 +1,309 @@
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.ai.rag.vectorStore import VectorStore
+from src.ai.rag.knowledgeBase import KnowledgeBase
+from src.ai.utils.text_preprocessor import preprocess_texts
+
+# Marker sent down the queues when a stage has no more batches
+_DONE = object()
+
+def chunk_document(content: str, chunk_size: int = 1000) -> List[str]:
+    """
+    Splits a document into chunks of whole lines of at most chunk_size characters
+
+    A single line longer than chunk_size becomes its own chunk.
+    """
+    chunks = []
+    current: List[str] = []
+    current_length = 0
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if current and current_length + len(line) + 1 > chunk_size:
+            chunks.append('\n'.join(current))
+            current, current_length = [], 0
+        current.append(line)
+        current_length += len(line) + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def analyze_chunks(texts: List[str]) -> Tuple[List[str], List[List[Dict[str, Any]]], float]:
+    """
+    Preprocesses chunks and extracts their entities; runs inside a worker process
+    """
+    # Imported here so the spaCy pipeline is only loaded in the worker processes
+    from src.ai.nlp.entityExtractor import extract_entities_batch
+
+    started = time.perf_counter()
+    preprocessed = preprocess_texts(texts)
+    entities = extract_entities_batch(texts)
+    return preprocessed, entities, time.perf_counter() - started
+
+class StageStats:
+    """
+    Item count and busy time of one pipeline stage
+    """
+    def __init__(self):
+        self.items = 0
+        self.seconds = 0.0
+
+    def record(self, items: int, seconds: float) -> None:
+        self.items += items
+        self.seconds += seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'items': self.items,
+            'seconds': self.seconds,
+            'items_per_second': self.items / self.seconds if self.seconds else 0.0
+        }
+
+class IngestionPipeline:
+    """
+    Streaming, incremental ingestion of documents into the knowledge base and vector store
+
+    Documents flow through chunk -> preprocess + extract_entities -> embed -> index,
+    with bounded queues between the stages and a process pool for the CPU-bound
+    analysis. Chunk ids are derived from the chunk's content hash, so unchanged
+    chunks are skipped and chunks that disappeared from a document are deleted.
+    Progress is checkpointed after indexing, so an interrupted run resumes where
+    it stopped. A checkpoint rewrites the whole index, so checkpoints are spaced
+    by time: at least checkpoint_seconds apart, and far enough apart that saving
+    takes no more than checkpoint_overhead of the run time. As the index grows
+    and saves get slower, checkpoints get rarer, which keeps the total
+    checkpoint I/O linear in the corpus size.
+    """
+    def __init__(self, vector_store: VectorStore, knowledge_base: KnowledgeBase, checkpoint_path: str,
+                 chunk_size: int = 1000, batch_size: int = 32, queue_size: int = 8,
+                 workers: Optional[int] = None, checkpoint_seconds: float = 300.0,
+                 checkpoint_overhead: float = 0.1):
+        self.vector_store = vector_store
+        self.knowledge_base = knowledge_base
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.workers = workers or max((os.cpu_count() or 2) - 1, 1)
+        self.checkpoint_seconds = checkpoint_seconds
+        self.checkpoint_overhead = checkpoint_overhead
+        self._last_save_seconds = 0.0
+        self.state = self._load_checkpoint()
+        self.stats: Dict[str, StageStats] = {name: StageStats() for name in ('chunk', 'analyze', 'embed', 'index')}
+        self.skipped_chunks = 0
+        self.deleted_chunks = 0
+        self._error: Optional[BaseException] = None
+        self._stop = threading.Event()
+
+    def run(self, documents: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Ingests documents given as {'id', 'content', 'metadata'} dicts and returns per-stage throughput
+        """
+        analyze_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embed_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        index_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            threads = [
+                threading.Thread(target=self._guard, args=(self._analyze_stage, analyze_queue, embed_queue, pool)),
+                threading.Thread(target=self._guard, args=(self._embed_stage, embed_queue, index_queue)),
+                threading.Thread(target=self._guard, args=(self._index_stage, index_queue, None))
+            ]
+            for thread in threads:
+                thread.start()
+
+            try:
+                for batch in self._chunk_stage(documents):
+                    self._put(analyze_queue, batch)
+            except BaseException as error:
+                self._fail(error)
+            finally:
+                self._put(analyze_queue, _DONE, force=True)
+                for thread in threads:
+                    thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+        self._save_checkpoint()
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Returns throughput per stage and counts of skipped and deleted chunks
+        """
+        return {
+            'stages': {name: stats.to_dict() for name, stats in self.stats.items()},
+            'skipped_chunks': self.skipped_chunks,
+            'deleted_chunks': self.deleted_chunks
+        }
+
+    def _chunk_stage(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        # Emit batches of new chunks, each followed by commits for the documents they complete
+        batch: Dict[str, Any] = {'chunks': [], 'commits': []}
+        for document in documents:
+            if self._stop.is_set():
+                return
+            started = time.perf_counter()
+            doc_id = str(document['id'])
+            chunk_ids: Dict[str, None] = {}
+            new_chunks = 0
+            for text in chunk_document(document['content'], self.chunk_size):
+                digest = content_hash(text)
+                chunk_id = f"{doc_id}:{digest[:16]}"
+                if chunk_id in chunk_ids:
+                    continue
+                chunk_ids[chunk_id] = None
+                if chunk_id in self.state['chunks']:
+                    self.skipped_chunks += 1
+                    continue
+                new_chunks += 1
+                batch['chunks'].append({
+                    'id': chunk_id,
+                    'content': text,
+                    'metadata': {**document.get('metadata', {}), 'document_id': doc_id, 'content_hash': digest}
+                })
+            batch['commits'].append((doc_id, list(chunk_ids)))
+            self.stats['chunk'].record(new_chunks, time.perf_counter() - started)
+
+            if len(batch['chunks']) >= self.batch_size:
+                yield batch
+                batch = {'chunks': [], 'commits': []}
+        if batch['chunks'] or batch['commits']:
+            yield batch
+
+    def _analyze_stage(self, inbox: queue.Queue, outbox: queue.Queue, pool: ProcessPoolExecutor) -> None:
+        # Keep a bounded number of batches in flight in the pool and forward results in order
+        in_flight: deque = deque()
+        while True:
+            batch = inbox.get()
+            if batch is _DONE:
+                break
+            texts = [chunk['content'] for chunk in batch['chunks']]
+            in_flight.append((batch, pool.submit(analyze_chunks, texts) if texts else None))
+            while len(in_flight) > self.workers:
+                self._forward_analyzed(in_flight.popleft(), outbox)
+        while in_flight:
+            self._forward_analyzed(in_flight.popleft(), outbox)
+
+    def _forward_analyzed(self, item: Tuple[Dict[str, Any], Any], outbox: queue.Queue) -> None:
+        batch, future = item
+        if future is not None:
+            preprocessed, entities, seconds = future.result()
+            for chunk, preprocessed_text, chunk_entities in zip(batch['chunks'], preprocessed, entities):
+                chunk['preprocessed'] = preprocessed_text
+                chunk['metadata']['entities'] = chunk_entities
+            self.stats['analyze'].record(len(batch['chunks']), seconds)
+        self._put(outbox, batch)
+
+    def _embed_stage(self, inbox: queue.Queue, outbox: queue.Queue) -> None:
+        while True:
+            batch = inbox.get()
+            if batch is _DONE:
+                break
+            if batch['chunks']:
+                started = time.perf_counter()
+                batch['vectors'] = self.vector_store.text_to_vectors([chunk['preprocessed'] for chunk in batch['chunks']])
+                self.stats['embed'].record(len(batch['chunks']), time.perf_counter() - started)
+            self._put(outbox, batch)
+
+    def _index_stage(self, inbox: queue.Queue) -> None:
+        since_checkpoint = 0
+        last_checkpoint = time.monotonic()
+        while True:
+            batch = inbox.get()
+            if batch is _DONE:
+                return
+            started = time.perf_counter()
+            chunks = batch['chunks']
+            if chunks:
+                self.knowledge_base.add_documents([
+                    {'id': chunk['id'], 'content': chunk['content'], 'metadata': chunk['metadata']}
+                    for chunk in chunks
+                ])
+                self.vector_store.add_documents([chunk['id'] for chunk in chunks], batch['vectors'])
+                for chunk in chunks:
+                    self.state['chunks'][chunk['id']] = chunk['metadata']['content_hash']
+
+            # Apply document commits: drop chunks that are no longer part of the document
+            for doc_id, chunk_ids in batch['commits']:
+                current = set(chunk_ids)
+                removed = [chunk_id for chunk_id in self.state['documents'].get(doc_id, []) if chunk_id not in current]
+                if removed:
+                    self.vector_store.delete_documents(removed)
+                    self.knowledge_base.delete_documents(removed)
+                    for chunk_id in removed:
+                        self.state['chunks'].pop(chunk_id, None)
+                    self.deleted_chunks += len(removed)
+                self.state['documents'][doc_id] = chunk_ids
+            self.stats['index'].record(len(chunks), time.perf_counter() - started)
+
+            since_checkpoint += len(chunks)
+            if since_checkpoint and time.monotonic() - last_checkpoint >= self._checkpoint_interval():
+                self._save_checkpoint()
+                since_checkpoint = 0
+                last_checkpoint = time.monotonic()
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        return {'chunks': {}, 'documents': {}}
+
+    def _checkpoint_interval(self) -> float:
+        # Space saves so that they take at most checkpoint_overhead of the time between them
+        return max(self.checkpoint_seconds, self._last_save_seconds / self.checkpoint_overhead)
+
+    def _save_checkpoint(self) -> None:
+        # Persist the index first so the checkpoint never claims chunks the index lacks
+        started = time.perf_counter()
+        if self.vector_store.index_path:
+            self.vector_store.save()
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        temporary_path = self.checkpoint_path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(temporary_path, self.checkpoint_path)
+        self._last_save_seconds = time.perf_counter() - started
+
+    def _guard(self, stage, inbox: queue.Queue, outbox: Optional[queue.Queue], *args) -> None:
+        # Run a stage; on failure stop the pipeline and keep draining so producers never block
+        try:
+            if outbox is not None:
+                stage(inbox, outbox, *args)
+            else:
+                stage(inbox, *args)
+        except BaseException as error:
+            self._fail(error)
+            while inbox.get() is not _DONE:
+                pass
+        finally:
+            if outbox is not None:
+                self._put(outbox, _DONE, force=True)
+
+    def _fail(self, error: BaseException) -> None:
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _put(self, outbox: queue.Queue, item: Any, force: bool = False) -> None:
+        # Give up on regular items once the pipeline has failed; end markers always go through
+        while True:
+            if self._stop.is_set() and not force:
+                return
+            try:
+                outbox.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
@@ -0,0 +1,112 @@
+import json
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import Json
+from src.ai.utils.lruCache import LRUCache
+
+def document_size(document: Dict[str, Any]) -> int:
+    """
+    Approximates the memory footprint of a cached document
+    """
+    return sys.getsizeof(document.get('content', '')) + len(json.dumps(document.get('metadata', {}), default=str))
+
+class KnowledgeBase:
+    """
+    Document store for retrieval, backed by PostgreSQL or an in-memory dictionary
+
+    Frequently retrieved documents are kept in an LRU cache bounded by size, so
+    repeated hits do not go back to the database.
+    """
+    def __init__(self, dsn: Optional[str] = None, table: str = 'documents',
+                 cache_max_items: int = 10000, cache_max_bytes: int = 64 * 1024 * 1024):
+        self.table = table
+        self._connection = psycopg2.connect(dsn) if dsn else None
+        self._documents: Dict[Any, Dict[str, Any]] = {}
+        self.cache = LRUCache(maxsize=cache_max_items, max_bytes=cache_max_bytes, sizeof=document_size)
+
+    def get_document(self, doc_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Returns a single document or None when it does not exist
+        """
+        return self.get_documents([doc_id]).get(doc_id)
+
+    def get_documents(self, doc_ids: Sequence[Any]) -> Dict[Any, Dict[str, Any]]:
+        """
+        Returns the documents for the given ids, fetching all cache misses in one round trip
+
+        Returned documents are shallow copies, so callers may add fields without touching the cache.
+        """
+        documents: Dict[Any, Dict[str, Any]] = {}
+        missing = []
+        for doc_id in dict.fromkeys(doc_ids):
+            document = self.cache.get(doc_id)
+            if document is not None:
+                documents[doc_id] = document
+            else:
+                missing.append(doc_id)
+
+        # Fetch every cache miss with a single bulk lookup
+        if missing:
+            for doc_id, document in self._fetch(missing).items():
+                self.cache.set(doc_id, document)
+                documents[doc_id] = document
+
+        return {doc_id: dict(document) for doc_id, document in documents.items()}
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        Inserts or replaces documents given as {'id', 'content', 'metadata'} dicts
+        """
+        if self._connection is not None:
+            query = sql.SQL(
+                "INSERT INTO {} (id, content, metadata) VALUES (%s, %s, %s) "
+                "ON CONFLICT (id) DO UPDATE SET content = EXCLUDED.content, metadata = EXCLUDED.metadata"
+            ).format(sql.Identifier(self.table))
+            with self._connection, self._connection.cursor() as cursor:
+                cursor.executemany(query, [
+                    (document['id'], document['content'], Json(document.get('metadata', {})))
+                    for document in documents
+                ])
+        else:
+            for document in documents:
+                self._documents[document['id']] = dict(document)
+
+        # Drop stale cached copies
+        for document in documents:
+            self.cache.pop(document['id'])
+
+    def delete_documents(self, doc_ids: Sequence[Any]) -> None:
+        """
+        Removes documents from the store and the cache
+        """
+        if self._connection is not None:
+            query = sql.SQL("DELETE FROM {} WHERE id = ANY(%s)").format(sql.Identifier(self.table))
+            with self._connection, self._connection.cursor() as cursor:
+                cursor.execute(query, (list(doc_ids),))
+        else:
+            for doc_id in doc_ids:
+                self._documents.pop(doc_id, None)
+
+        for doc_id in doc_ids:
+            self.cache.pop(doc_id)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Returns hit/miss counters and occupancy of the document cache
+        """
+        return self.cache.stats()
+
+    def _fetch(self, doc_ids: List[Any]) -> Dict[Any, Dict[str, Any]]:
+        if self._connection is None:
+            return {doc_id: self._documents[doc_id] for doc_id in doc_ids if doc_id in self._documents}
+
+        query = sql.SQL("SELECT id, content, metadata FROM {} WHERE id = ANY(%s)").format(sql.Identifier(self.table))
+        with self._connection, self._connection.cursor() as cursor:
+            cursor.execute(query, (list(doc_ids),))
+            rows = cursor.fetchall()
+        return {
+            doc_id: {'id': doc_id, 'content': content, 'metadata': metadata or {}}
+            for doc_id, content, metadata in rows
+        }
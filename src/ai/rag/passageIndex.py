@@ -0,0 +1,91 @@
+import hashlib
+from collections import Counter
+from typing import Any, Dict, List
+import numpy as np
+from scipy.sparse import csc_matrix
+from src.ai.utils.lruCache import LRUCache
+from src.ai.utils.metrics import metrics
+from src.ai.utils.text_preprocessor import preprocess_texts
+from src.config import SYNTHESIS_CONFIG
+
+class PassageIndex:
+    """
+    Precomputed passages of one document with a sparse passage-by-term count matrix
+
+    Terms are the tokens preprocess_text produces, so a query preprocessed the same
+    way matches them regardless of punctuation and case.
+    """
+    def __init__(self, content: str):
+        # Split once and keep the lowercased forms for entity matching
+        self.passages = content.split('\n')
+        self.lowered = [passage.lower() for passage in self.passages]
+
+        # The preprocessed passages are the terms for BM25 and the text that is embedded
+        self.preprocessed = preprocess_texts(self.passages)
+        terms = [passage.split() for passage in self.preprocessed]
+
+        # Term counts for BM25, stored column-wise for per-term lookups
+        self.term_vocabulary: Dict[str, int] = {}
+        rows: List[int] = []
+        columns: List[int] = []
+        counts: List[int] = []
+        for row, passage_terms in enumerate(terms):
+            for term, count in Counter(passage_terms).items():
+                rows.append(row)
+                columns.append(self.term_vocabulary.setdefault(term, len(self.term_vocabulary)))
+                counts.append(count)
+        self.term_counts = csc_matrix(
+            (np.array(counts, dtype=np.float32), (np.array(rows, dtype=np.int32), np.array(columns, dtype=np.int32))),
+            shape=(len(self.passages), max(len(self.term_vocabulary), 1))
+        )
+        self.lengths = np.array([len(passage_terms) for passage_terms in terms], dtype=np.float32)
+
+    def entity_overlap(self, entities: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Counts the entities each passage mentions, matching case-insensitively
+        """
+        overlap = np.zeros(len(self.passages), dtype=np.float32)
+        for entity in entities:
+            text = entity['text'].lower()
+            overlap += np.fromiter((text in passage for passage in self.lowered), dtype=bool, count=len(self.lowered))
+        return overlap
+
+    def term_frequencies(self, terms: List[str]) -> np.ndarray:
+        """
+        Returns a passages x terms matrix with the count of each preprocessed term per passage
+        """
+        frequencies = np.zeros((len(self.passages), len(terms)), dtype=np.float32)
+        known = [(j, self.term_vocabulary[term]) for j, term in enumerate(terms) if term in self.term_vocabulary]
+        if known:
+            positions, columns = zip(*known)
+            frequencies[:, list(positions)] = self.term_counts[:, list(columns)].toarray()
+        return frequencies
+
+def bm25_scores(term_frequencies: np.ndarray, lengths: np.ndarray, k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """
+    Okapi BM25 score of every passage for the query terms given as columns of term_frequencies
+    """
+    if not len(lengths) or not term_frequencies.shape[1]:
+        return np.zeros(len(lengths), dtype=np.float32)
+    document_frequency = (term_frequencies > 0).sum(axis=0)
+    idf = np.log(1.0 + (len(lengths) - document_frequency + 0.5) / (document_frequency + 0.5))
+    average_length = max(float(lengths.mean()), 1e-9)
+    norm = k1 * (1.0 - b + b * lengths / average_length)
+    saturated = term_frequencies * (k1 + 1.0) / (term_frequencies + norm[:, None])
+    return saturated @ idf
+
+# Passage indexes of recently used documents, keyed by a hash of their content
+passage_index_cache = LRUCache(maxsize=SYNTHESIS_CONFIG.get('passage_cache_size', 2048))
+metrics.register_cache('passage_index', passage_index_cache.stats)
+
+def get_passage_index(document: Dict[str, Any]) -> PassageIndex:
+    """
+    Returns the cached passage index of a document, building it on first use
+    """
+    content = document['content']
+    key = hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+    index = passage_index_cache.get(key)
+    if index is None:
+        index = PassageIndex(content)
+        passage_index_cache.set(key, index)
+    return index
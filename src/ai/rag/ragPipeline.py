@@ -0,0 +1,157 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from src.ai.nlp.intentClassifier import classify_intent
+from src.ai.nlp.entityExtractor import extract_entities
+from src.ai.rag.documentRetriever import retrieve_documents
+from src.ai.rag.contextSynthesizer import synthesize_context
+from src.ai.models.chatModel import stream_response
+from src.ai.utils.metrics import metrics
+from src.config import RETRIEVAL_CONFIG
+
+# Per-request time budget and the share of it kept back for generation
+DEADLINE_SECONDS = RETRIEVAL_CONFIG.get('deadline_seconds', 10.0)
+GENERATION_RESERVE_SECONDS = RETRIEVAL_CONFIG.get('generation_reserve_seconds', 6.0)
+SYNTHESIS_SECONDS = RETRIEVAL_CONFIG.get('synthesis_seconds', 0.5)
+TOP_K = RETRIEVAL_CONFIG.get('top_k', 5)
+
+# Separate pools so slow retrieval I/O never starves the model calls, and generation never starves either
+model_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_CONFIG.get('model_workers', max(os.cpu_count() or 1, 4)), thread_name_prefix='rag-model'
+)
+retrieval_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_CONFIG.get('retrieval_workers', 8), thread_name_prefix='rag-retrieval'
+)
+generation_executor = ThreadPoolExecutor(
+    max_workers=RETRIEVAL_CONFIG.get('generation_workers', 2), thread_name_prefix='rag-generation'
+)
+
+async def answer(query: str, chat_history: List[Dict[str, str]], session_id: Optional[str] = None,
+                 deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Answers one chat turn, running intent classification, NER and retrieval concurrently
+
+    Args:
+        query (str): The user's message
+        chat_history (List[Dict[str, str]]): Previous messages, ending with the user's message
+        session_id (Optional[str]): Session whose prompt key/values may be reused
+        deadline_seconds (Optional[float]): Time budget for the whole turn
+
+    Returns:
+        Dict[str, Any]: The response, intent, entities, documents, the stages that were
+        skipped because they missed the deadline or failed ('degraded') and per-stage timings
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + (deadline_seconds if deadline_seconds is not None else DEADLINE_SECONDS)
+    # Stages before generation must leave the reserve for it, but always get part of the budget
+    analysis_deadline = max(deadline - GENERATION_RESERVE_SECONDS, started + (deadline - started) / 2)
+    timings: Dict[str, float] = {}
+    degraded: List[str] = []
+
+    # Step 1: Start the independent stages at once
+    tasks = {
+        'intent': _run_stage(loop, model_executor, timings, 'intent', classify_intent, query),
+        'entities': _run_stage(loop, model_executor, timings, 'entities', extract_entities, query),
+        'retrieval': _run_stage(loop, retrieval_executor, timings, 'retrieval', retrieve_documents, query, TOP_K)
+    }
+    results = await _gather_until(tasks, analysis_deadline, degraded)
+    intent = results.get('intent')
+    entities = results.get('entities')
+    documents = results.get('retrieval') or []
+
+    # Step 2: Synthesize the context, reusing the extracted entities; without documents generate without context
+    context = ""
+    if documents:
+        synthesis = {
+            'synthesis': _run_stage(loop, model_executor, timings, 'synthesis', synthesize_context,
+                                    documents, query, None, entities if entities is not None else [])
+        }
+        synthesis_deadline = min(max(analysis_deadline, loop.time()) + SYNTHESIS_SECONDS, deadline)
+        context = (await _gather_until(synthesis, synthesis_deadline, degraded)).get('synthesis', "")
+
+    # Step 3: Generate with whatever budget is left, stopping decoding at the deadline
+    response, complete = await _generate(loop, timings, chat_history, context, session_id, deadline)
+    if not complete:
+        degraded.append('generation')
+
+    timings['total'] = loop.time() - started
+    metrics.observe('rag_request_ms', timings['total'] * 1000.0)
+    for stage in degraded:
+        metrics.increment('degraded_stages', stage=stage)
+    return {
+        'response': response,
+        'intent': intent,
+        'entities': entities or [],
+        'documents': documents,
+        'degraded': degraded,
+        'timings': timings
+    }
+
+def answer_sync(query: str, chat_history: List[Dict[str, str]], session_id: Optional[str] = None,
+                deadline_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Blocking wrapper around answer for callers without an event loop
+    """
+    return asyncio.run(answer(query, chat_history, session_id, deadline_seconds))
+
+async def _run_stage(loop: asyncio.AbstractEventLoop, executor: ThreadPoolExecutor, timings: Dict[str, float],
+                     name: str, function: Callable, *args) -> Any:
+    # Run a blocking stage in its executor and record how long it took
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(executor, function, *args)
+    finally:
+        timings[name] = time.perf_counter() - started
+
+async def _gather_until(stages: Dict[str, Any], deadline: float, degraded: List[str]) -> Dict[str, Any]:
+    # Wait for the stages until the deadline; late or failed stages are dropped and reported as degraded
+    tasks = {asyncio.ensure_future(coroutine): name for name, coroutine in stages.items()}
+    timeout = max(deadline - asyncio.get_running_loop().time(), 0.0)
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        # The executor thread keeps running, but its result is no longer awaited
+        task.cancel()
+        degraded.append(tasks[task])
+
+    results = {}
+    for task in done:
+        if task.exception() is not None:
+            degraded.append(tasks[task])
+        else:
+            results[tasks[task]] = task.result()
+    return results
+
+async def _generate(loop: asyncio.AbstractEventLoop, timings: Dict[str, float], chat_history: List[Dict[str, str]],
+                    context: str, session_id: Optional[str], deadline: float) -> tuple:
+    # Decode in the generation pool; at the deadline or on failure keep the text produced so far
+    cancel_event = threading.Event()
+    chunks: List[str] = []
+
+    def generate() -> None:
+        for chunk in stream_response(chat_history, context, cancel_event, session_id):
+            chunks.append(chunk)
+
+    started = time.perf_counter()
+    future = loop.run_in_executor(generation_executor, generate)
+    complete = False
+    try:
+        await asyncio.wait_for(asyncio.shield(future), timeout=max(deadline - loop.time(), 0.0))
+        complete = True
+    except asyncio.TimeoutError:
+        # Stop decoding and wait for the thread to finish its current step
+        cancel_event.set()
+        await asyncio.gather(future, return_exceptions=True)
+    except Exception:
+        # A failed generation is reported as degraded, like the other stages
+        pass
+    finally:
+        cancel_event.set()
+        timings['generation'] = time.perf_counter() - started
+    return "".join(chunks), complete
+
+# Export the main functions
+__all__ = ['answer', 'answer_sync']
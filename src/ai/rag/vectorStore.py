@@ -0,0 +1,135 @@
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import torch
+from src.ai.rag.annIndex import HNSWIndex
+from src.ai.utils.diskCache import DiskCache
+from src.ai.utils.lruCache import LRUCache
+from src.ai.utils.metrics import BATCH_SIZE_BUCKETS, metrics
+
+class VectorStore:
+    """
+    Embeds text and serves approximate nearest-neighbour search over document vectors
+    """
+    def __init__(self, embedding_model: str = 'sentence-transformers/all-MiniLM-L6-v2',
+                 index_path: Optional[str] = None, M: int = 16, ef_construction: int = 200,
+                 ef_search: int = 64, max_length: int = 256, mmap: bool = True,
+                 embedding_dtype: str = 'float32', batch_size: int = 32, cache_size: int = 10000,
+                 cache_ttl_seconds: Optional[float] = 3600.0, cache_path: Optional[str] = None):
+        self.embedding_model = embedding_model
+        self.index_path = index_path
+        self.max_length = max_length
+        self.embedding_dtype = embedding_dtype
+        self.batch_size = batch_size
+
+        # Embedding caches keyed by preprocessed text: in memory, plus an optional disk tier
+        self.vector_cache = LRUCache(maxsize=cache_size, ttl_seconds=cache_ttl_seconds)
+        self.disk_cache = DiskCache(cache_path, ttl_seconds=cache_ttl_seconds) if cache_path else None
+        metrics.register_cache('embedding', self.vector_cache.stats)
+
+        # Load the encoder used for queries and documents; transformers is imported only here
+        from transformers import AutoModel, AutoTokenizer
+        self.tokenizer = AutoTokenizer.from_pretrained(embedding_model)
+        self.encoder = AutoModel.from_pretrained(embedding_model)
+        self.encoder.eval()
+        self.dim = self.encoder.config.hidden_size
+
+        # Reload a persisted index when available instead of rebuilding it; its vectors
+        # are memory-mapped so that worker processes share them through the page cache
+        if index_path and HNSWIndex.exists(index_path):
+            self.index = HNSWIndex.load(index_path, mmap=mmap)
+        else:
+            self.index = HNSWIndex(self.dim, M=M, ef_construction=ef_construction, ef_search=ef_search)
+
+    def text_to_vector(self, text: str) -> np.ndarray:
+        """
+        Encodes text into a normalized embedding
+        """
+        return self.text_to_vectors([text])[0]
+
+    def text_to_vectors(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Encodes many texts into normalized embeddings, one row per text
+
+        Cached embeddings are reused; the remaining distinct texts are encoded in batches.
+        """
+        vectors: Dict[str, np.ndarray] = {}
+        pending = []
+        for text in dict.fromkeys(texts):
+            vector = self.vector_cache.get(text)
+            if vector is not None:
+                vectors[text] = vector
+            else:
+                pending.append(text)
+
+        # Look the in-memory misses up in the disk tier
+        if pending and self.disk_cache is not None:
+            stored = self.disk_cache.get_many([self._disk_key(text) for text in pending])
+            still_pending = []
+            for text in pending:
+                data = stored.get(self._disk_key(text))
+                if data is None:
+                    still_pending.append(text)
+                    continue
+                vector = np.frombuffer(data, dtype=np.float32)
+                self.vector_cache.set(text, vector)
+                vectors[text] = vector
+            pending = still_pending
+
+        # Encode whatever is left in batches and populate both cache tiers
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            encoded = self._encode(batch)
+            for text, vector in zip(batch, encoded):
+                vector.setflags(write=False)
+                self.vector_cache.set(text, vector)
+                vectors[text] = vector
+            if self.disk_cache is not None:
+                self.disk_cache.set_many({self._disk_key(text): vector.tobytes() for text, vector in zip(batch, encoded)})
+
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([vectors[text] for text in texts])
+
+    @metrics.timed('encode_embeddings')
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        # Encode a batch in one forward pass and mean-pool the token embeddings, ignoring padding
+        metrics.observe('embedding_batch_size', len(texts), buckets=BATCH_SIZE_BUCKETS)
+        inputs = self.tokenizer(texts, return_tensors='pt', padding=True, truncation=True, max_length=self.max_length)
+        with torch.no_grad():
+            hidden_states = self.encoder(**inputs).last_hidden_state
+        mask = inputs['attention_mask'].unsqueeze(-1).to(hidden_states.dtype)
+        pooled = ((hidden_states * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)).numpy().astype(np.float32)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.maximum(norms, 1e-12)
+
+    def _disk_key(self, text: str) -> str:
+        # Include the encoder name so a model change never serves stale embeddings
+        return hashlib.sha256(f"{self.embedding_model}\0{text}".encode('utf-8')).hexdigest()
+
+    def add_documents(self, doc_ids: Sequence[Any], vectors: np.ndarray) -> None:
+        """
+        Inserts or replaces document vectors in the index
+        """
+        self.index.add(doc_ids, vectors)
+
+    def delete_documents(self, doc_ids: Sequence[Any]) -> None:
+        """
+        Removes documents from the index
+        """
+        self.index.delete(doc_ids)
+
+    def similarity_search(self, query_vector: np.ndarray, top_k: int, ef: Optional[int] = None) -> List[Tuple[Any, float]]:
+        """
+        Returns the top_k (document id, similarity) pairs; ef trades recall against latency
+        """
+        return self.index.search(query_vector, top_k, ef=ef)
+
+    def save(self, index_path: Optional[str] = None) -> None:
+        """
+        Persists the index to disk
+        """
+        index_path = index_path or self.index_path
+        if not index_path:
+            raise ValueError("No index_path configured for the vector store")
+        self.index.save(index_path, dtype=self.embedding_dtype)
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+from src.ai.utils.metrics import BATCH_SIZE_BUCKETS, Histogram, metrics
+
+# Default histogram buckets for queue times (milliseconds)
+QUEUE_TIME_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+# Sentinel placed on the queue to stop the worker thread
+_STOP = object()
+
+class MicroBatchScheduler:
+    """
+    Queues individual requests and runs them through a batch function in groups
+
+    A batch is dispatched once it reaches max_batch_size or once the oldest queued
+    request has waited max_wait_ms, whichever comes first. The worker thread starts
+    on the first submit, so creating a scheduler at import time starts no threads.
+    """
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, name: Optional[str] = None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name or 'batch-scheduler'
+        # Shared with the metrics registry so batch sizes and queue times are exported
+        self.batch_size_histogram: Histogram = metrics.histogram('batch_size', BATCH_SIZE_BUCKETS, scheduler=self.name)
+        self.queue_time_histogram: Histogram = metrics.histogram('batch_queue_time_ms', QUEUE_TIME_BUCKETS_MS, scheduler=self.name)
+        self._queue: queue.Queue = queue.Queue()
+        self._stopped = False
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Enqueues a single input and returns a future for its output
+        """
+        if self._stopped:
+            raise RuntimeError(f"{self.name} has been shut down")
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        """
+        Submits an input and blocks until its output is available
+        """
+        return self.submit(item).result()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns batch-size and queue-time histograms
+        """
+        return {
+            'batch_size': self.batch_size_histogram.snapshot(),
+            'queue_time_ms': self.queue_time_histogram.snapshot(),
+            'pending': self._queue.qsize()
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the worker after the requests already queued have been processed
+        """
+        self._stopped = True
+        if self._worker is None:
+            return
+        self._queue.put(_STOP)
+        if wait:
+            self._worker.join()
+
+    def _ensure_started(self) -> None:
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    worker.start()
+                    self._worker = worker
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+
+            # Collect more requests until the batch is full or the oldest request's deadline passes
+            batch = [entry]
+            deadline = entry[2] + self.max_wait
+            stop_after_batch = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop_after_batch = True
+                    break
+                batch.append(entry)
+
+            self._dispatch(batch)
+            if stop_after_batch:
+                return
+
+    def _dispatch(self, batch: List[tuple]) -> None:
+        # Drop requests whose callers cancelled while waiting in the queue
+        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        # Record batch statistics
+        started = time.monotonic()
+        self.batch_size_histogram.observe(len(batch))
+        for _, _, enqueued in batch:
+            self.queue_time_histogram.observe((started - enqueued) * 1000.0)
+
+        # Run the batch and hand each caller its own result
+        try:
+            outputs = self.process_batch([item for item, _, _ in batch])
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"Batch function returned {len(outputs)} outputs for {len(batch)} inputs")
+        except Exception as error:
+            for _, future, _ in batch:
+                future.set_exception(error)
+            return
+
+        for (_, future, _), output in zip(batch, outputs):
+            future.set_result(output)
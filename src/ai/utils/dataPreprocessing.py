@@ -1,16 +1,82 @@
+import hashlib
+import re
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, LabelEncoder
-from nltk import word_tokenize, stopwords
+from typing import Dict, List
 from string import punctuation
-from config import PREPROCESSING_CONFIG
+from src.config import PREPROCESSING_CONFIG
+from src.ai.utils.lruCache import LRUCache
+from src.ai.utils.lazyModel import LazyModel
+from src.ai.utils.metrics import metrics
 
-# Initialize global stop_words set
-stop_words = set(stopwords.words('english'))
+def load_stop_words() -> set:
+    # NLTK is imported on first use; importing it costs more than the rest of this module
+    from nltk.corpus import stopwords
+    return set(stopwords.words('english'))
 
+# Global stop_words set, loaded from the NLTK corpus on first use
+stop_words = LazyModel('stopwords', load_stop_words)
+
+# Bounded cache of preprocessed text keyed by a hash of the input and the options
+preprocess_cache = LRUCache(maxsize=PREPROCESSING_CONFIG.get('cache_size', 50000))
+metrics.register_cache('preprocess', preprocess_cache.stats)
+
+# Text that word_tokenize splits exactly like the fast regex tokenizer: words (letters, digits,
+# underscores and inner hyphens) with an optional contraction suffix, whitespace, single commas and colons
+# not followed by a digit, the marks NLTK always splits off (!?;) and a single final period
+_FAST_TOKENIZE_TEXT = re.compile(
+    r"(?:\s"
+    r"|\w+(?:-\w+)*(?:n't|N'T|'(?:ll|LL|re|RE|ve|VE|[sSmMdD]))?(?![\w-])"
+    r"|[,:](?![\d,:])"
+    r"|[!?;])*"
+    r"(?:\.\s*)?"
+)
+_FAST_TOKEN = re.compile(
+    r"\w+(?:-\w+)*?(?=n't|N'T)"
+    r"|n't|N'T|'(?:ll|LL|re|RE|ve|VE|[sSmMdD])"
+    r"|\w+(?:-\w+)*"
+    r"|[,:;!?.]"
+)
+# Words that NLTK's Treebank rules split into two tokens, also once a contraction is split off
+_NLTK_SPLIT_WORDS = re.compile(r"\b(cannot|gimme|gonna|gotta|lemme|wanna)(?:n't)?\b", re.IGNORECASE)
+
+def tokenize_text(text: str) -> List[str]:
+    # Use the regex fast path only where it is guaranteed to match word_tokenize;
+    # internal periods need NLTK's sentence splitter and always take the NLTK path
+    if (PREPROCESSING_CONFIG.get('fast_tokenizer', True)
+            and _FAST_TOKENIZE_TEXT.fullmatch(text)
+            and not _NLTK_SPLIT_WORDS.search(text)):
+        return _FAST_TOKEN.findall(text)
+    from nltk import word_tokenize
+    return word_tokenize(text)
+
+@metrics.timed('preprocess_text')
 def preprocess_text(text: str, remove_stopwords: bool = True, lowercase: bool = True) -> str:
+    # Return the cached result if this text was preprocessed before with the same options
+    cache_key = _preprocess_cache_key(text, remove_stopwords, lowercase)
+    preprocessed_text = preprocess_cache.get(cache_key)
+    if preprocessed_text is None:
+        preprocessed_text = _preprocess_text(text, remove_stopwords, lowercase)
+        preprocess_cache.set(cache_key, preprocessed_text)
+    
+    return preprocessed_text
+
+def preprocess_texts(texts: List[str], remove_stopwords: bool = True, lowercase: bool = True) -> List[str]:
+    # Preprocess each distinct text once, reusing cached results
+    results: Dict[str, str] = {}
+    for text in texts:
+        if text not in results:
+            results[text] = preprocess_text(text, remove_stopwords, lowercase)
+    
+    return [results[text] for text in texts]
+
+def _preprocess_cache_key(text: str, remove_stopwords: bool, lowercase: bool) -> tuple:
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    return (digest, remove_stopwords, lowercase)
+
+def _preprocess_text(text: str, remove_stopwords: bool, lowercase: bool) -> str:
     # Tokenize the input text
-    tokens = word_tokenize(text)
+    tokens = tokenize_text(text)
     
     # Remove punctuation
     tokens = [token for token in tokens if token not in punctuation]
@@ -21,7 +87,8 @@ def preprocess_text(text: str, remove_stopwords: bool = True, lowercase: bool =
     
     # Remove stopwords if specified
     if remove_stopwords:
-        tokens = [token for token in tokens if token not in stop_words]
+        english_stop_words = stop_words.get()
+        tokens = [token for token in tokens if token not in english_stop_words]
     
     # Join tokens back into a string
     preprocessed_text = ' '.join(tokens)
@@ -33,6 +100,8 @@ def normalize_numerical_data(data: np.ndarray, method: str = 'standard') -> np.n
     if method not in ['standard', 'minmax']:
         raise ValueError("Method must be either 'standard' or 'minmax'")
     
+    from sklearn.preprocessing import StandardScaler, MinMaxScaler
+    
     # Initialize appropriate scaler
     scaler = StandardScaler() if method == 'standard' else MinMaxScaler()
     
@@ -42,6 +111,8 @@ def normalize_numerical_data(data: np.ndarray, method: str = 'standard') -> np.n
     return normalized_data
 
 def encode_categorical_data(data: pd.Series) -> tuple:
+    from sklearn.preprocessing import LabelEncoder
+    
     # Initialize LabelEncoder
     encoder = LabelEncoder()
     
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+class DiskCache:
+    """
+    Persistent key/value cache of byte strings stored in SQLite, with an optional time-to-live
+    """
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        self._connection.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the stored bytes for key, or None when missing or expired
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self.ttl_seconds is not None and time.time() - row[1] > self.ttl_seconds:
+            self.delete(key)
+            return None
+        return row[0]
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """
+        Returns the stored bytes for every key that is present and not expired
+        """
+        if not keys:
+            return {}
+        found = {}
+        cutoff = time.time() - self.ttl_seconds if self.ttl_seconds is not None else None
+        # Stay well below SQLite's limit on bound parameters
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT key, value, created FROM cache WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+            for key, value, created in rows:
+                if cutoff is None or created >= cutoff:
+                    found[key] = value
+        return found
+
+    def set(self, key: str, value: bytes) -> None:
+        """
+        Stores bytes under key, replacing any previous value
+        """
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, bytes]) -> None:
+        """
+        Stores several entries in one transaction
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)",
+                [(key, sqlite3.Binary(value), now) for key, value in items.items()]
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        """
+        Deletes expired entries and returns how many were removed
+        """
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock, self._connection:
+            cursor = self._connection.execute("DELETE FROM cache WHERE created < ?", (time.time() - self.ttl_seconds,))
+        return cursor.rowcount
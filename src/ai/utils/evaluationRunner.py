@@ -0,0 +1,230 @@
+import glob
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from nltk.translate.bleu_score import sentence_bleu
+from src.ai.utils.modelEvaluation import rouge, calculate_response_appropriateness
+
+# Per-turn scores averaged into the chat metrics, in the order evaluate_chat_model reports them
+CHAT_SCORES = ('bleu_score', 'rouge_1', 'rouge_2', 'rouge_l', 'response_appropriateness')
+
+class RunningMean:
+    """
+    Mean that can be updated incrementally and merged with means computed elsewhere
+    """
+    def __init__(self, total: float = 0.0, count: int = 0):
+        self.total = total
+        self.count = count
+
+    def add(self, values: Sequence[float]) -> None:
+        self.total += float(np.sum(values))
+        self.count += len(values)
+
+    def merge(self, other: 'RunningMean') -> None:
+        self.total += other.total
+        self.count += other.count
+
+    @property
+    def value(self) -> float:
+        return self.total / self.count if self.count else float('nan')
+
+class ConfusionCounts:
+    """
+    Mergeable confusion counts from which the classification metrics are derived
+    """
+    def __init__(self, counts: Optional[Dict[str, Dict[str, int]]] = None):
+        self.counts: Dict[str, Dict[str, int]] = counts or {}
+
+    def add(self, y_true: Sequence[Any], y_pred: Sequence[Any]) -> None:
+        for true_label, predicted_label in zip(y_true, y_pred):
+            row = self.counts.setdefault(str(true_label), {})
+            row[str(predicted_label)] = row.get(str(predicted_label), 0) + 1
+
+    def merge(self, other: 'ConfusionCounts') -> None:
+        for true_label, row in other.counts.items():
+            merged = self.counts.setdefault(true_label, {})
+            for predicted_label, count in row.items():
+                merged[predicted_label] = merged.get(predicted_label, 0) + count
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns the same metrics as evaluate_classification_model, with weighted averages
+        """
+        labels = sorted(set(self.counts) | {label for row in self.counts.values() for label in row})
+        position = {label: i for i, label in enumerate(labels)}
+        cm = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        for true_label, row in self.counts.items():
+            for predicted_label, count in row.items():
+                cm[position[true_label], position[predicted_label]] = count
+
+        true_positives = np.diag(cm).astype(np.float64)
+        support = cm.sum(axis=1).astype(np.float64)
+        predicted = cm.sum(axis=0).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.nan_to_num(true_positives / predicted)
+            recall = np.nan_to_num(true_positives / support)
+            f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+        weights = support / support.sum() if support.sum() else support
+        return {
+            'accuracy': float(true_positives.sum() / cm.sum()) if cm.sum() else 0.0,
+            'precision': float(np.dot(weights, precision)),
+            'recall': float(np.dot(weights, recall)),
+            'f1_score': float(np.dot(weights, f1)),
+            'confusion_matrix': cm.tolist()
+        }
+
+class ChatEvaluation:
+    """
+    Mergeable running aggregates of the chat model metrics
+    """
+    def __init__(self):
+        self.scores = {name: RunningMean() for name in CHAT_SCORES}
+        self.intents = ConfusionCounts()
+
+    def merge(self, other: 'ChatEvaluation') -> None:
+        for name, mean in other.scores.items():
+            self.scores[name].merge(mean)
+        self.intents.merge(other.intents)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns the metric dict of evaluate_chat_model, plus intent metrics when intents were scored
+        """
+        result = {name: self.scores[name].value for name in CHAT_SCORES}
+        # Not computed yet, as in evaluate_chat_model
+        result['conversation_coherence'] = 0.0
+        if self.intents.counts:
+            result['intent_classification'] = self.intents.metrics()
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'scores': {name: [mean.total, mean.count] for name, mean in self.scores.items()},
+            'intents': self.intents.counts
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'ChatEvaluation':
+        evaluation = cls()
+        for name, (total, count) in state.get('scores', {}).items():
+            evaluation.scores[name] = RunningMean(total, count)
+        evaluation.intents = ConfusionCounts(state.get('intents'))
+        return evaluation
+
+def score_turns(turns: List[Dict[str, Any]]) -> ChatEvaluation:
+    """
+    Scores a chunk of logged turns; runs inside a worker process
+
+    Each turn carries 'context', 'response' (the reference) and 'generated_response',
+    and optionally 'intent' and 'predicted_intent'.
+    """
+    evaluation = ChatEvaluation()
+    references = [turn['response'] for turn in turns]
+    hypotheses = [turn['generated_response'] for turn in turns]
+
+    # Same per-pair BLEU and ROUGE as evaluate_text_generation; the means are taken when merging
+    evaluation.scores['bleu_score'].add([sentence_bleu([ref.split()], hyp.split()) for ref, hyp in zip(references, hypotheses)])
+    rouge_scores = rouge.get_scores(hypotheses, references)
+    for name, key in (('rouge_1', 'rouge-1'), ('rouge_2', 'rouge-2'), ('rouge_l', 'rouge-l')):
+        evaluation.scores[name].add([score[key]['f'] for score in rouge_scores])
+    evaluation.scores['response_appropriateness'].add([
+        calculate_response_appropriateness([turn['context']], [hypothesis])
+        for turn, hypothesis in zip(turns, hypotheses)
+    ])
+
+    labelled = [turn for turn in turns if 'intent' in turn and 'predicted_intent' in turn]
+    evaluation.intents.add([turn['intent'] for turn in labelled], [turn['predicted_intent'] for turn in labelled])
+    return evaluation
+
+class EvaluationRunner:
+    """
+    Streams logged turns from JSONL shards and scores them in parallel
+
+    Shards are read chunk by chunk, chunks are scored in a process pool and the
+    partial aggregates are merged as they complete, so memory stays bounded by
+    the chunks in flight. The merged aggregates and the completed chunks are
+    checkpointed, so an interrupted run resumes without rescoring them.
+    """
+    def __init__(self, shards: Sequence[str], checkpoint_path: Optional[str] = None,
+                 chunk_size: int = 1000, workers: Optional[int] = None, checkpoint_every: int = 50):
+        # Accept glob patterns and keep a stable order so chunk ids survive restarts
+        self.shards = sorted({path for pattern in shards for path in (glob.glob(pattern) or [pattern])})
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = chunk_size
+        self.workers = workers or max((os.cpu_count() or 2) - 1, 1)
+        self.checkpoint_every = checkpoint_every
+        self.evaluation, self.completed = self._load_checkpoint()
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Scores every chunk not completed yet and returns the metrics over all shards
+        """
+        in_flight: deque = deque()
+        since_checkpoint = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for chunk_id, turns in self._chunks():
+                in_flight.append((chunk_id, pool.submit(score_turns, turns)))
+                # Bound the number of chunks held in memory
+                while len(in_flight) > 2 * self.workers:
+                    since_checkpoint += self._merge(in_flight.popleft())
+                    if since_checkpoint >= self.checkpoint_every:
+                        self._save_checkpoint()
+                        since_checkpoint = 0
+            while in_flight:
+                self._merge(in_flight.popleft())
+
+        self._save_checkpoint()
+        return self.evaluation.metrics()
+
+    def _chunks(self) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        for shard in self.shards:
+            with open(shard) as f:
+                index = 0
+                turns: List[Dict[str, Any]] = []
+                for line_number, line in enumerate(f):
+                    if line_number // self.chunk_size != index:
+                        if turns:
+                            yield f"{shard}:{index}", turns
+                        index, turns = line_number // self.chunk_size, []
+                    # Skip parsing chunks that a previous run already scored
+                    if f"{shard}:{index}" in self.completed or not line.strip():
+                        continue
+                    turns.append(json.loads(line))
+                if turns:
+                    yield f"{shard}:{index}", turns
+
+    def _merge(self, item: Tuple[str, Any]) -> int:
+        chunk_id, future = item
+        self.evaluation.merge(future.result())
+        self.completed.add(chunk_id)
+        return 1
+
+    def _load_checkpoint(self) -> Tuple[ChatEvaluation, set]:
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+            if state.get('chunk_size') == self.chunk_size:
+                return ChatEvaluation.from_dict(state['evaluation']), set(state['completed'])
+        return ChatEvaluation(), set()
+
+    def _save_checkpoint(self) -> None:
+        if not self.checkpoint_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        temporary_path = self.checkpoint_path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump({
+                'chunk_size': self.chunk_size,
+                'completed': sorted(self.completed),
+                'evaluation': self.evaluation.to_dict()
+            }, f)
+        os.replace(temporary_path, self.checkpoint_path)
+
+def evaluate_chat_logs(shards: Sequence[str], checkpoint_path: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+    """
+    Evaluates the chat model over logged turns in JSONL shards, resuming from checkpoint_path when given
+    """
+    return EvaluationRunner(shards, checkpoint_path, **kwargs).run()
@@ -0,0 +1,71 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Iterable, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Loaders run by warmup(), keyed by name; filled as model modules are imported
+_warmups: Dict[str, Callable[[], Any]] = {}
+
+class LazyModel(Generic[T]):
+    """
+    Thread-safe handle that loads a model on first use and keeps it for the life of the process
+    """
+    def __init__(self, name: str, loader: Callable[[], T]):
+        self.name = name
+        self._loader = loader
+        self._value: Optional[T] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        register_warmup(name, self.get)
+
+    def get(self) -> T:
+        """
+        Returns the model, loading it if this is the first call
+        """
+        # Fast path without the lock once the model is loaded
+        if self._loaded:
+            return self._value
+        with self._lock:
+            # Another thread may have completed the load while we were waiting
+            if not self._loaded:
+                self._value = self._loader()
+                self._loaded = True
+        return self._value
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def unload(self) -> None:
+        """
+        Drops the loaded model; the next get() loads it again
+        """
+        with self._lock:
+            self._value = None
+            self._loaded = False
+
+    def __repr__(self) -> str:
+        return f"LazyModel(name={self.name!r}, loaded={self._loaded})"
+
+def register_warmup(name: str, loader: Callable[[], Any]) -> None:
+    """
+    Registers a loader to be run by warmup(), for models not held in a LazyModel
+    """
+    _warmups[name] = loader
+
+def warmup(names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """
+    Loads the named models, or every registered one, and returns the seconds each load took
+
+    Only models whose modules have been imported are registered, so a process warms up
+    exactly the models it can serve. Intended for readiness probes and start-up hooks.
+    """
+    timings = {}
+    for name in (list(names) if names is not None else list(_warmups)):
+        if name not in _warmups:
+            raise KeyError(f"Model '{name}' is not registered for warmup")
+        started = time.perf_counter()
+        _warmups[name]()
+        timings[name] = time.perf_counter() - started
+    return timings
@@ -0,0 +1,325 @@
+import bisect
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter as FrameCounter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default buckets for stage latencies (milliseconds), token counts and batch sizes
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# Metric and label key of a series, e.g. ('stage_latency_ms', (('stage', 'retrieve_documents'),))
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+class Histogram:
+    """
+    Fixed-bucket histogram; counts are kept per bucket and accumulated when rendered
+    """
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Records a single observation
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns bucket counts, total count and mean
+        """
+        with self._lock:
+            labels = [str(bound) for bound in self.buckets] + ['+Inf']
+            return {
+                'buckets': dict(zip(labels, self.counts)),
+                'count': self.count,
+                'sum': self.total,
+                'mean': self.total / self.count if self.count else 0.0
+            }
+
+class Span:
+    """
+    Timing of one stage of a request
+    """
+    __slots__ = ('name', 'started', 'duration_ms')
+
+    def __init__(self, name: str, started: float, duration_ms: float):
+        self.name = name
+        self.started = started
+        self.duration_ms = duration_ms
+
+    def __repr__(self) -> str:
+        return f"Span(name={self.name!r}, duration_ms={self.duration_ms:.3f})"
+
+class MetricsRegistry:
+    """
+    Process-wide stage spans, histograms, counters and cache statistics
+
+    While disabled, spans and observations return immediately, so instrumented
+    code pays a single flag check. Metrics are exported in the Prometheus text
+    format over HTTP or to a file.
+    """
+    def __init__(self, enabled: bool = True, prefix: str = 'ai'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._histograms: Dict[SeriesKey, Histogram] = {}
+        self._counters: Dict[SeriesKey, float] = {}
+        self._caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def histogram(self, name: str, buckets: Sequence[float] = LATENCY_BUCKETS_MS, **labels: str) -> Histogram:
+        """
+        Returns the histogram for a metric and label set, creating it on first use
+        """
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS_MS, **labels: str) -> None:
+        if self.enabled:
+            self.histogram(name, buckets, **labels).observe(value)
+
+    def increment(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        if self.enabled:
+            key = (name, tuple(sorted(labels.items())))
+            with self._lock:
+                self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def register_cache(self, name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Registers a cache's stats() callable; its hits, misses and hit rate are read at export time
+        """
+        self._caches[name] = stats
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """
+        Times a stage into the stage latency histogram and the current trace, if any
+        """
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000.0
+            self.histogram('stage_latency_ms', stage=stage).observe(duration_ms)
+            trace = getattr(self._local, 'trace', None)
+            if trace is not None:
+                trace.append(Span(stage, started, duration_ms))
+
+    def timed(self, stage: str) -> Callable:
+        """
+        Decorator that runs the whole function inside span(stage)
+        """
+        def decorator(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.span(stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def trace(self) -> Iterator[List[Span]]:
+        """
+        Collects the spans finished on this thread while the block runs, for a per-request breakdown
+        """
+        previous = getattr(self._local, 'trace', None)
+        spans: List[Span] = []
+        self._local.trace = spans
+        try:
+            yield spans
+        finally:
+            self._local.trace = previous
+
+    def render_prometheus(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format
+        """
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            counters = sorted(self._counters.items(), key=lambda item: item[0])
+
+        declared = set()
+        for (name, labels), histogram in histograms:
+            metric = f"{self.prefix}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} histogram")
+                declared.add(metric)
+            snapshot = histogram.snapshot()
+            cumulative = 0
+            for bound, count in snapshot['buckets'].items():
+                cumulative += count
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(labels)} {snapshot['sum']}")
+            lines.append(f"{metric}_count{_labels(labels)} {snapshot['count']}")
+
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{_labels(labels)} {value}")
+
+        cache_lines = {'hits': [], 'misses': [], 'hit_rate': []}
+        for cache, stats in sorted(self._caches.items()):
+            values = stats()
+            hits, misses = values.get('hits', 0), values.get('misses', 0)
+            labels = (('cache', cache),)
+            cache_lines['hits'].append(f"{self.prefix}_cache_hits_total{_labels(labels)} {hits}")
+            cache_lines['misses'].append(f"{self.prefix}_cache_misses_total{_labels(labels)} {misses}")
+            hit_rate = hits / (hits + misses) if hits + misses else 0.0
+            cache_lines['hit_rate'].append(f"{self.prefix}_cache_hit_rate{_labels(labels)} {hit_rate}")
+        for kind, metric_type in (('hits', 'counter'), ('misses', 'counter'), ('hit_rate', 'gauge')):
+            if cache_lines[kind]:
+                suffix = '_total' if metric_type == 'counter' else ''
+                lines.append(f"# TYPE {self.prefix}_cache_{kind}{suffix} {metric_type}")
+                lines.extend(cache_lines[kind])
+
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path: str) -> None:
+        """
+        Writes the Prometheus text to path atomically, e.g. for a node exporter textfile collector
+        """
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'w') as f:
+            f.write(self.render_prometheus())
+        os.replace(temporary_path, path)
+
+    def start_file_sink(self, path: str, interval: float = 15.0) -> threading.Event:
+        """
+        Rewrites the metrics file every interval seconds until the returned event is set
+        """
+        stop = threading.Event()
+
+        def run() -> None:
+            while not stop.wait(interval):
+                self.write_file(path)
+
+        threading.Thread(target=run, name='metrics-file-sink', daemon=True).start()
+        return stop
+
+    def serve_prometheus(self, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+        """
+        Serves GET /metrics in a background thread; call shutdown() on the returned server to stop
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads at a fixed interval; can be started and stopped at runtime
+
+    Samples are aggregated as folded stacks ("outer;inner count"), the input format of flame graph tools.
+    """
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: FrameCounter = FrameCounter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def folded(self) -> str:
+        """
+        Returns the collected samples as folded stacks, most frequent first
+        """
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w') as f:
+            f.write(self.folded() + "\n")
+
+    def reset(self) -> None:
+        self.samples = FrameCounter()
+
+    def _run(self) -> None:
+        own_thread = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                # Walk the frames directly; extract_stack would read source lines on every sample
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(names))] += 1
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+# Process-wide registry; set AI_METRICS_ENABLED=0 to start with instrumentation switched off
+metrics = MetricsRegistry(enabled=os.environ.get('AI_METRICS_ENABLED', '1') != '0')
+
+# Process-wide profiler, off until started at runtime
+profiler = SamplingProfiler()
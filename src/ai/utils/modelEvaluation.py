@@ -3,7 +3,7 @@ from sklearn.metrics import accuracy_score, precision_recall_fscore_support, con
 from typing import List, Dict, Any
 from nltk.translate.bleu_score import sentence_bleu
 from rouge import Rouge
-from @.config import EVALUATION_CONFIG
+from src.config import EVALUATION_CONFIG
 
 # Initialize Rouge instance for text evaluation
 rouge = Rouge()
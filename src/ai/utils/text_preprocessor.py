@@ -0,0 +1,4 @@
+from src.ai.utils.dataPreprocessing import preprocess_text, preprocess_texts, tokenize_text
+
+# Export the text preprocessing functions used across the AI modules
+__all__ = ['preprocess_text', 'preprocess_texts', 'tokenize_text']
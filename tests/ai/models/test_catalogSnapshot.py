@@ -0,0 +1,85 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from src.ai.models.catalogSnapshot import CatalogSnapshot
+
+class FakeSKUService:
+    """
+    In-memory SKU service exposing get_product_info and is_product_available, recording every call
+    """
+    def __init__(self, products):
+        self.products = products
+        self.info_calls = []
+        self.availability_calls = []
+
+    def get_product_info(self, product_ids):
+        self.info_calls.append(list(product_ids))
+        return [dict(self.products[product_id]) for product_id in product_ids if product_id in self.products]
+
+    def is_product_available(self, product_id):
+        self.availability_calls.append(product_id)
+        return self.products[product_id].get('in_stock', False)
+
+@pytest.fixture
+def service():
+    return FakeSKUService({
+        'A': {'id': 'A', 'name': 'Router', 'price': 120.0, 'available': True, 'stock': 4, 'tags': ['network']},
+        'B': {'id': 'B', 'name': 'Switch', 'price': 80.0, 'available': False},
+        'C': {'id': 'C', 'name': 'Cable', 'price': 5.0, 'in_stock': True},
+        'D': {'id': 'D', 'name': 'Rack', 'price': 900.0}
+    })
+
+@pytest.fixture
+def snapshot(service):
+    snapshot = CatalogSnapshot(service.get_product_info, service.is_product_available, refresh_interval=0)
+    yield snapshot
+    snapshot.stop()
+
+def test_products_returns_full_records_and_fetches_each_sku_once(service, snapshot):
+    assert snapshot.current is None
+    assert snapshot.products(['A', 'X', 'B']) == [service.products['A'], service.products['B']]
+    assert snapshot.products(['B', 'A']) == [service.products['B'], service.products['A']]
+    assert service.info_calls == [['A', 'X', 'B']]
+
+    snapshot.products(['A', 'C'])
+    assert service.info_calls[-1] == ['C']
+    assert len(snapshot.current) == 3
+
+def test_returned_records_are_copies(service, snapshot):
+    snapshot.products(['A'])[0]['price'] = 0.0
+    assert snapshot.products(['A'])[0]['price'] == 120.0
+
+def test_missing_availability_is_resolved_through_the_service(service, snapshot):
+    entries = snapshot.entries(['A', 'B', 'C', 'D'])
+    assert {sku_id: entry['available'] for sku_id, entry in entries.items()} == {
+        'A': True, 'B': False, 'C': True, 'D': False
+    }
+    assert service.availability_calls == ['C', 'D']
+    assert entries['A'] == {'price': 120.0, 'available': True, 'stock': 4.0}
+    assert entries['B']['stock'] is None
+
+def test_missing_availability_is_unavailable_without_a_check(service):
+    snapshot = CatalogSnapshot(service.get_product_info, refresh_interval=0)
+    assert snapshot.entries(['C'])['C']['available'] is False
+
+def test_refresh_publishes_changes_and_drops_deleted_skus(service, snapshot):
+    snapshot.products(['A', 'B'])
+    first = snapshot.current
+    assert snapshot.refresh() is first
+
+    service.products['A']['price'] = 100.0
+    del service.products['B']
+    second = snapshot.refresh()
+    assert second.version == first.version + 1
+    assert snapshot.products(['A'])[0]['price'] == 100.0
+    assert 'B' not in second
+    # Readers holding the previous version keep seeing it unchanged
+    assert first.get('A')['price'] == 120.0 and 'B' in first
+
+def test_version_over_max_bytes_is_not_published(service):
+    snapshot = CatalogSnapshot(service.get_product_info, service.is_product_available, refresh_interval=0,
+                               max_bytes=1)
+    assert snapshot.products(['A']) == [service.products['A']]
+    assert snapshot.current is None
+    assert isinstance(snapshot.last_error, MemoryError)
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+import pytest
+
+torch = pytest.importorskip('torch')
+pytest.importorskip('pandas')
+
+from src.ai.models import chatModel
+
+# Words the fake model answers with, ending in a space before the comma that post-processing removes
+REPLY = ["Sure", ",", "the", "quote", "is", "ready"]
+
+class FakeTokenizer:
+    """
+    Whitespace tokenizer that assigns ids to words as it sees them; id 0 is end of sequence
+    """
+    eos_token_id = 0
+
+    def __init__(self):
+        self.words = ["<eos>"]
+
+    def token_id(self, word):
+        if word not in self.words:
+            self.words.append(word)
+        return self.words.index(word)
+
+    def __call__(self, text, return_tensors=None):
+        input_ids = torch.tensor([[self.token_id(word) for word in text.split()]])
+        return SimpleNamespace(to=lambda device: {'input_ids': input_ids})
+
+    def decode(self, token_ids, skip_special_tokens=False):
+        return " ".join(self.words[int(token_id)] for token_id in token_ids
+                        if not (skip_special_tokens and int(token_id) == self.eos_token_id))
+
+class FakeModel:
+    """
+    Causal LM that answers every prompt with REPLY, through generate() or step by step
+    """
+    device = 'cpu'
+
+    def __init__(self, tokenizer):
+        self.reply = [tokenizer.token_id(word) for word in REPLY] + [tokenizer.eos_token_id]
+        self.vocab_size = len(tokenizer.words)
+        self.prompt_length = 0
+
+    def generate(self, input_ids, max_length, **kwargs):
+        return torch.tensor([input_ids[0].tolist() + self.reply])[:, :max_length]
+
+    def __call__(self, input_ids, past_key_values=None, use_cache=True):
+        # past_key_values is the number of tokens seen so far
+        if past_key_values is None:
+            self.prompt_length, past_key_values = input_ids.shape[1], 0
+        seen = past_key_values + input_ids.shape[1]
+        logits = torch.zeros(1, input_ids.shape[1], self.vocab_size)
+        logits[0, -1, self.reply[min(seen - self.prompt_length, len(self.reply) - 1)]] = 1.0
+        return SimpleNamespace(logits=logits, past_key_values=seen)
+
+@pytest.fixture
+def fake_chat_model(monkeypatch):
+    tokenizer = FakeTokenizer()
+    model = FakeModel(tokenizer)
+    monkeypatch.setattr(chatModel, 'chat_model', SimpleNamespace(get=lambda: (model, tokenizer)))
+    monkeypatch.setattr(chatModel, 'preprocess_texts', lambda texts: list(texts))
+    monkeypatch.setattr(chatModel, 'response_cache', None)
+    monkeypatch.setitem(chatModel.MODEL_CONFIG, 'max_length', 200)
+    return model
+
+HISTORY = [{'role': 'user', 'content': "Can I get a quote for 20 seats?"}]
+CONTEXT = "Seats cost 10 each."
+
+def test_generate_response_returns_only_the_generated_text(fake_chat_model):
+    assert chatModel.generate_response(HISTORY, CONTEXT) == "Sure, the quote is ready."
+
+def test_stream_response_yields_the_same_text_as_generate_response(fake_chat_model):
+    chunks = list(chatModel.stream_response(HISTORY, CONTEXT))
+    assert len(chunks) > 1
+    assert "".join(chunks) == chatModel.generate_response(HISTORY, CONTEXT)
@@ -0,0 +1,96 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from src.ai.models.quoteValidator import BulkQuoteValidator
+
+CATALOG = {
+    'A': {'price': 100.0, 'available': True, 'stock': 5},
+    'B': {'price': 50.0, 'available': False},
+    'C': {'price': 20.0}
+}
+
+class RecordingLookup:
+    """
+    Catalog lookup over CATALOG that records the SKU ids of every call
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, sku_ids):
+        self.calls.append(list(sku_ids))
+        return {sku_id: CATALOG[sku_id] for sku_id in sku_ids if sku_id in CATALOG}
+
+def make_quote(product_ids, items, total=None):
+    quote = {'products': [{'id': product_id} for product_id in product_ids], 'pricing': {'items': items}}
+    if total is not None:
+        quote['total'] = total
+    return quote
+
+def pricing_rule(quote):
+    pricing_rule.calls += 1
+    return ["Pricing calculations are incorrect"], ["Discount expires soon"]
+
+@pytest.fixture(autouse=True)
+def reset_pricing_rule():
+    pricing_rule.calls = 0
+
+def validate(validator, quotes, **kwargs):
+    return [result for _, result in validator.validate(quotes, **kwargs)]
+
+def test_default_checks_only_availability_of_listed_products():
+    validator = BulkQuoteValidator(RecordingLookup())
+    quote = make_quote(['A', 'B', 'C', 'X'], [{'product_id': 'A', 'price': 999.0}], total=1.0)
+    assert validate(validator, [quote]) == [{
+        'is_valid': False,
+        'issues': ["Product B is not available", "Product C is not available", "Product X is not available"],
+        'warnings': []
+    }]
+
+def test_pricing_items_without_product_id_are_reported():
+    validator = BulkQuoteValidator(RecordingLookup())
+    quote = make_quote(['A'], [{'product_id': 'A', 'price': 100.0}, {'price': 10.0}])
+    [result] = validate(validator, [quote])
+    assert result['issues'] == ["Pricing item 1 has no product id"]
+
+def test_quote_rules_run_only_when_applied():
+    lookup = RecordingLookup()
+    validator = BulkQuoteValidator(lookup, quote_rules=[pricing_rule])
+    quotes = [make_quote(['A'], [{'product_id': 'A', 'price': 100.0}]) for _ in range(3)]
+
+    assert all(result['is_valid'] for result in validate(validator, quotes))
+    assert pricing_rule.calls == 0
+    assert lookup.calls == [['A']]
+
+    [result] = validate(validator, [make_quote(['B'], [])], apply_quote_rules=True)
+    assert result['issues'] == ["Product B is not available", "Pricing calculations are incorrect"]
+    assert result['warnings'] == ["Discount expires soon"]
+
+def test_line_rules():
+    validator = BulkQuoteValidator(RecordingLookup(), line_rules=True, max_discount=0.2)
+    quote = make_quote(
+        ['A', 'X', 'C'],
+        [{'product_id': 'A', 'price': 600.0, 'quantity': 6}, {'product_id': 'X', 'price': -1.0}],
+        total=600.0
+    )
+    [result] = validate(validator, [quote])
+    assert result['issues'] == [
+        "Product A: quantity 6 exceeds stock of 5",
+        "Product X does not exist",
+        "Product X has an invalid price",
+        "Product C is not available",
+        "Pricing calculations are incorrect"
+    ]
+
+def test_products_without_pricing_item_are_not_invalid_prices():
+    validator = BulkQuoteValidator(RecordingLookup(), line_rules=True)
+    [result] = validate(validator, [make_quote(['A'], [])])
+    assert result == {'is_valid': True, 'issues': [], 'warnings': []}
+
+def test_changed_skus_skip_untouched_quotes():
+    lookup = RecordingLookup()
+    validator = BulkQuoteValidator(lookup)
+    quotes = [make_quote(['A'], []), make_quote(['B'], [])]
+    pairs = list(validator.validate(quotes, changed_skus=['B']))
+    assert [quote for quote, _ in pairs] == [quotes[1]]
+    assert lookup.calls == [['B']]
@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+TESTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT = os.path.dirname(TESTS)
+
+# Seconds a fresh interpreter may spend importing one model module, libraries included
+IMPORT_BUDGET_SECONDS = float(os.environ.get('AI_IMPORT_BUDGET_SECONDS', 5.0))
+
+# Libraries the model modules import only when a model is loaded or first used
+DEFERRED_LIBRARIES = ['nltk', 'sklearn', 'spacy', 'tensorflow', 'transformers']
+
+MODEL_MODULES = [
+    'src.ai.models.chatModel',
+    pytest.param('src.ai.models.quoteModel', marks=pytest.mark.xfail(
+        raises=AssertionError, reason="quoteModel's '@.' imports are not valid Python")),
+    pytest.param('src.ai.nlp.intentClassifier', marks=pytest.mark.xfail(
+        raises=AssertionError, reason="src.ai.utils.model_loader is not part of the repository")),
+    'src.ai.nlp.entityExtractor',
+    'src.ai.rag.documentRetriever',
+    'src.ai.utils.dataPreprocessing',
+]
+
+# Imports the module in a fresh interpreter, with the settings stubbed, and reports the time
+# taken, the threads started, the lazy models loaded and the deferred libraries imported. Only a third-party package
+# that is not installed counts as missing; any other import error fails the probe.
+PROBE = """
+import importlib, json, sys, threading, time
+sys.path.insert(0, sys.argv[2])
+import configStub
+configStub.install()
+started = time.perf_counter()
+try:
+    importlib.import_module(sys.argv[1])
+except ModuleNotFoundError as error:
+    missing = (error.name or '').split('.')[0]
+    if not missing or missing == 'src':
+        raise
+    print(json.dumps({'missing': error.name}))
+    sys.exit(0)
+seconds = time.perf_counter() - started
+from src.ai.utils import lazyModel
+loaded = [name for name, loader in lazyModel._warmups.items()
+          if isinstance(getattr(loader, '__self__', None), lazyModel.LazyModel) and loader.__self__.loaded]
+threads = [thread.name for thread in threading.enumerate() if thread is not threading.main_thread()]
+libraries = [name for name in sys.argv[3].split(',') if name in sys.modules]
+print(json.dumps({'seconds': seconds, 'loaded': loaded, 'threads': threads, 'libraries': libraries}))
+"""
+
+def import_fresh(module: str) -> dict:
+    result = subprocess.run([sys.executable, '-c', PROBE, module, TESTS, ','.join(DEFERRED_LIBRARIES)], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+@pytest.mark.parametrize('module', MODEL_MODULES)
+def test_import_loads_no_models_and_starts_no_threads(module):
+    report = import_fresh(module)
+    if 'missing' in report:
+        pytest.skip(f"Dependency not installed: {report['missing']}")
+    assert report['loaded'] == []
+    assert report['threads'] == []
+    assert report['libraries'] == []
+    assert report['seconds'] < IMPORT_BUDGET_SECONDS
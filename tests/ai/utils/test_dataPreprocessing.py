@@ -0,0 +1,65 @@
+import random
+import pytest
+
+# Third-party packages dataPreprocessing needs; the module itself must import
+for package in ('nltk', 'pandas', 'sklearn'):
+    pytest.importorskip(package)
+
+from nltk import word_tokenize
+from src.ai.utils import dataPreprocessing
+
+# Chat-style messages that should all take the fast path
+MESSAGES = [
+    "Hi, I can't find the pricing page.",
+    "I'm not sure; we'll see!",
+    "Don't you think it's too expensive?",
+    "Our team's e-mail: sales",
+    "YOU'RE RIGHT, I DON'T KNOW.",
+    "Héllo, ça va? Très bien.",
+    "Could you send me a quote for 200 licenses?",
+    "well-known vendor, isn't it",
+]
+
+# Text NLTK splits in ways the fast path does not model
+FALLBACK = ["10:30 works", "3,000 units", "ok... fine", "It is Mr. Smith.", "I'd like 'quotes'", "cannot do", '"quoted"']
+
+# Fragments combined into random strings around the edge cases of NLTK's rules
+PIECES = ["a", "Bo", "don", "n", "t", "'", "'s", "'S", "'ll", "'Ll", "n't", "N'T", "n'T", "1", "9", "_", "-", "--",
+          " ", "  ", "\n", ",", ":", ";", "!", "?", ".", "é", "x-y", "can", "not", "'re", "'m", "'d", "'ve"]
+
+def punkt_installed():
+    try:
+        word_tokenize("Punkt data is installed.")
+    except LookupError:
+        return False
+    return True
+
+@pytest.fixture(scope='module')
+def reference_tokenize():
+    # Without the punkt data, compare against NLTK's word tokenizer without sentence splitting;
+    # fast-path text has no internal period, so splitting it into sentences changes no token
+    if punkt_installed():
+        return word_tokenize
+    return lambda text: word_tokenize(text, preserve_line=True)
+
+def takes_fast_path(text):
+    return bool(dataPreprocessing._FAST_TOKENIZE_TEXT.fullmatch(text)) and not dataPreprocessing._NLTK_SPLIT_WORDS.search(text)
+
+@pytest.mark.parametrize('text', MESSAGES)
+def test_fast_path_matches_word_tokenize(text, reference_tokenize):
+    assert takes_fast_path(text)
+    assert dataPreprocessing.tokenize_text(text) == reference_tokenize(text)
+
+@pytest.mark.parametrize('text', FALLBACK)
+def test_other_text_falls_back_to_nltk(text):
+    assert not takes_fast_path(text)
+    if not punkt_installed():
+        pytest.skip("NLTK punkt data is not installed")
+    assert dataPreprocessing.tokenize_text(text) == word_tokenize(text)
+
+def test_fast_path_matches_word_tokenize_on_random_text(reference_tokenize):
+    rng = random.Random(0)
+    for _ in range(20000):
+        text = "".join(rng.choice(PIECES) for _ in range(rng.randint(1, 10)))
+        if takes_fast_path(text):
+            assert dataPreprocessing._FAST_TOKEN.findall(text) == reference_tokenize(text), text
@@ -0,0 +1,54 @@
+import json
+import pytest
+
+for package in ('nltk', 'rouge', 'sklearn'):
+    pytest.importorskip(package)
+
+from src.ai.utils import modelEvaluation
+from src.ai.utils.evaluationRunner import EvaluationRunner, evaluate_chat_logs
+
+TURNS = [
+    {'context': "How much are 20 seats?", 'response': "Twenty seats cost 200 dollars per month.",
+     'generated_response': "Twenty seats cost 200 dollars a month.", 'intent': 'pricing', 'predicted_intent': 'pricing'},
+    {'context': "Do you offer a trial?", 'response': "Yes, every plan has a 14 day free trial.",
+     'generated_response': "Yes, there is a free trial.", 'intent': 'trial', 'predicted_intent': 'pricing'},
+    {'context': "Can I pay yearly?", 'response': "Yearly billing saves ten percent.",
+     'generated_response': "You can pay yearly and save ten percent.", 'intent': 'billing', 'predicted_intent': 'billing'},
+    {'context': "Who do I contact for support?", 'response': "Write to support and we answer within a day.",
+     'generated_response': "Contact support by email.", 'intent': 'support', 'predicted_intent': 'support'},
+    {'context': "Is there a discount for schools?", 'response': "Schools get half off every plan.",
+     'generated_response': "Schools get a discount of half.", 'intent': 'pricing', 'predicted_intent': 'pricing'},
+]
+
+@pytest.fixture
+def shards(tmp_path):
+    # Two shards, the second with a blank line, split unevenly
+    paths = []
+    for name, turns in (('a.jsonl', TURNS[:3]), ('b.jsonl', TURNS[3:])):
+        path = tmp_path / name
+        path.write_text("\n".join(json.dumps(turn) for turn in turns) + "\n\n")
+        paths.append(str(path))
+    return paths
+
+def test_run_matches_evaluate_chat_model(shards):
+    metrics = evaluate_chat_logs(shards, chunk_size=2, workers=2)
+    expected = modelEvaluation.evaluate_chat_model(
+        TURNS, [{'response': turn['generated_response']} for turn in TURNS])
+    for name in ('bleu_score', 'rouge_1', 'rouge_2', 'rouge_l', 'response_appropriateness', 'conversation_coherence'):
+        assert metrics[name] == pytest.approx(expected[name]), name
+
+def test_intent_metrics_match_evaluate_classification_model(shards):
+    metrics = evaluate_chat_logs(shards, chunk_size=2, workers=2)['intent_classification']
+    expected = modelEvaluation.evaluate_classification_model(
+        [turn['intent'] for turn in TURNS], [turn['predicted_intent'] for turn in TURNS])
+    for name in ('accuracy', 'precision', 'recall', 'f1_score'):
+        assert metrics[name] == pytest.approx(expected[name]), name
+    assert metrics['confusion_matrix'] == expected['confusion_matrix']
+
+def test_resumes_from_checkpoint_without_rescoring(shards, tmp_path):
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    first = evaluate_chat_logs(shards, checkpoint, chunk_size=2, workers=2)
+
+    resumed = EvaluationRunner(shards, checkpoint, chunk_size=2, workers=2)
+    assert list(resumed._chunks()) == []
+    assert resumed.run() == first
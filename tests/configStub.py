@@ -0,0 +1,25 @@
+import importlib.util
+import sys
+import types
+
+# Deployment settings modules, which are not part of the repository
+CONFIG_MODULES = ('src.config',)
+
+class Settings(types.ModuleType):
+    """
+    Stand-in settings module whose every setting is an empty dict, so modules run with their defaults
+    """
+    def __getattr__(self, name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        # Keep the dict so every importer of a setting shares it
+        setattr(self, name, {})
+        return getattr(self, name)
+
+def install() -> None:
+    """
+    Registers a stand-in for every settings module that cannot be imported
+    """
+    for name in CONFIG_MODULES:
+        if name not in sys.modules and importlib.util.find_spec(name) is None:
+            sys.modules[name] = Settings(name)
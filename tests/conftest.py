@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Make the src.ai.* modules importable from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Stand in for the deployment settings when they are not installed
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import configStub
+configStub.install()